@@ -1,18 +1,66 @@
 #!/usr/bin/env python
 
+import concurrent.futures
 import hashlib
 import itertools
+import os
 import sys
+from collections import deque
+from collections.abc import Iterator
+
+# Nonces are checked by chunks of consecutive decimal suffixes
+CHUNK_DIGITS = 5
+CHUNK_SIZE = 10**CHUNK_DIGITS
+SUFFIXES = [str(n).zfill(CHUNK_DIGITS).encode() for n in range(CHUNK_SIZE)]
+
+
+def mine_chunk(key: str, zeros: int, chunk: int) -> list[tuple[int, bytes]]:
+    full_bytes, half_byte = divmod(zeros, 2)
+    prefix = b"\0" * full_bytes
+    key_hash = hashlib.md5(key.encode())
+    # All nonces share the same leading digits, hash them only once
+    if chunk == 0:
+        suffixes = [str(n).encode() for n in range(CHUNK_SIZE)]
+    else:
+        key_hash.update(str(chunk).encode())
+        suffixes = SUFFIXES
+    found: list[tuple[int, bytes]] = []
+    for n, suffix in enumerate(suffixes):
+        hash = key_hash.copy()
+        hash.update(suffix)
+        digest = hash.digest()
+        if not digest.startswith(prefix):
+            continue
+        if half_byte and digest[full_bytes] >= 0x10:
+            continue
+        found.append((chunk * CHUNK_SIZE + n, digest))
+    return found
+
+
+# Yields, in order, the nonces (and digests) whose hash start with `zeros` zeros
+def mine(key: str, zeros: int, start: int = 0) -> Iterator[tuple[int, bytes]]:
+    executor = concurrent.futures.ProcessPoolExecutor()
+    try:
+        chunks = (
+            executor.submit(mine_chunk, key, zeros, chunk)
+            for chunk in itertools.count(start // CHUNK_SIZE)
+        )
+        # Keep all workers busy, while yielding results in order
+        in_flight = deque(itertools.islice(chunks, 2 * (os.cpu_count() or 1)))
+        while True:
+            for nonce, digest in in_flight.popleft().result():
+                if nonce >= start:
+                    yield nonce, digest
+            in_flight.append(next(chunks))
+    finally:
+        executor.shutdown(cancel_futures=True)
 
 
 def solve(input: str) -> str:
     def crack_password(door_id: str) -> str:
         password: list[str] = []
-        for i in itertools.count():
-            hash = hashlib.md5((door_id + str(i)).encode()).hexdigest()
-            if not hash.startswith("00000"):
-                continue
-            password.append(hash[5])
+        for _, digest in mine(door_id, 5):
+            password.append(f"{digest[2]:x}")
             if len(password) == 8:
                 break
         return "".join(password)
@@ -5,7 +5,6 @@ import heapq
 import itertools
 import sys
 from collections.abc import Iterator
-from typing import NamedTuple
 
 NUM_FLOORS = 4
 
@@ -23,17 +22,9 @@ class Generator:
 Item = Microchip | Generator
 
 
-@dataclasses.dataclass(frozen=True, order=True)
-class State:
-    class Floor(NamedTuple):
-        chip: int
-        generator: int
-
-    elevator: int
-    items: tuple[Floor, ...]
-
-    def __post_init__(self) -> None:
-        assert self.items == tuple(sorted(self.items))  # Sanity check
+# A state is packed into an int: for each floor a bitmask of the items on it, with
+# microchips in the low bits and generators in the high bits, then the elevator
+State = int
 
 
 def solve(input: str) -> int:
@@ -60,132 +51,113 @@ def solve(input: str) -> int:
             for it in parse_floor(line)
         }
 
-    def to_state(elevator: int, floors: dict[Item, int]) -> State:
-        elements = {it.element for it in floors}
-        return State(
-            elevator=elevator,
-            items=tuple(
-                sorted(
-                    State.Floor(floors[Microchip(elem)], floors[Generator(elem)])
-                    for elem in elements
+    def solve(elevator: int, floors: dict[Item, int]) -> int:
+        elements = sorted({it.element for it in floors})
+        n = len(elements)
+        width = 2 * n  # Bits used by each floor
+        floor_mask = (1 << width) - 1
+        chips_mask = (1 << n) - 1
+        elevator_shift = NUM_FLOORS * width
+
+        def items_at(state: State, floor: int) -> int:
+            return (state >> (floor * width)) & floor_mask
+
+        def pack(elevator: int, pairs: list[tuple[int, int]]) -> State:
+            # Elements are interchangeable, sorting their floors gives a canonical state
+            state = elevator << elevator_shift
+            for i, (chip, generator) in enumerate(sorted(pairs)):
+                state |= 1 << (chip * width + i)
+                state |= 1 << (generator * width + n + i)
+            return state
+
+        def canonical(state: State) -> State:
+            floors = [items_at(state, floor) for floor in range(NUM_FLOORS)]
+            pairs = [
+                (
+                    next(f for f, items in enumerate(floors) if items >> i & 1),
+                    next(f for f, items in enumerate(floors) if items >> (n + i) & 1),
                 )
-            ),
-        )
+                for i in range(n)
+            ]
+            return pack(state >> elevator_shift, pairs)
 
-    def from_state(state: State) -> tuple[int, dict[Item, int]]:
-        floors: dict[Item, int] = {}
-        for i, (chip, generator) in enumerate(state.items):
-            floors[Microchip(str(i))] = chip
-            floors[Generator(str(i))] = generator
-        return state.elevator, floors
-
-    def solve(state: State) -> int:
-        def items_at(
-            item_type: type[Item],
-            floor: int,
-            items: dict[Item, int],
-        ) -> set[str]:
-            return {
-                it.element
-                for it, it_floor in items.items()
-                if it_floor == floor and isinstance(it, item_type)
-            }
+        def is_safe(items: int) -> bool:
+            chips, generators = items & chips_mask, items >> n
+            # Chips are fried by generators, unless their own generator is there
+            return generators == 0 or chips & ~generators == 0
 
         def neighbours(state: State) -> Iterator[State]:
-            elevator, all_items = from_state(state)
-            chips = items_at(Microchip, elevator, all_items)
-            gens = items_at(Generator, elevator, all_items)
+            elevator = state >> elevator_shift
+            here = items_at(state, elevator)
+            items = [1 << i for i in range(width) if here >> i & 1]
+            moves = items + [a | b for a, b in itertools.combinations(items, 2)]
             for dest_floor in (elevator - 1, elevator + 1):
                 # Don't move the elevator out of bounds
                 if dest_floor < 0 or dest_floor >= NUM_FLOORS:
                     continue
+                # No use in bringing items down to empty floors
+                if dest_floor < elevator and not any(
+                    items_at(state, floor) for floor in range(dest_floor + 1)
+                ):
+                    continue
 
-                dest_chips = items_at(Microchip, dest_floor, all_items)
-                dest_gens = items_at(Generator, dest_floor, all_items)
-                unmatched_chips = dest_chips - dest_gens
-                if unmatched_chips:
-                    assert not dest_gens  # Sanity check
-
-                single_items: list[Item] = []
-                # Chips
-                for chip in chips:
-                    # can move to floors with no generator, or a matching generator
-                    if dest_gens and chip not in dest_gens:
-                        continue
-                    single_items.append(Microchip(chip))
-                # Generators
-                for gen in gens:
-                    # can move to floors without unmatched chips or only their chip
-                    if unmatched_chips - {gen}:
-                        continue
-                    # ... but only if they're not currently protecting their chip
-                    if gen in chips and gens - {gen}:
-                        continue
-                    single_items.append(Generator(gen))
-
-                double_items: list[tuple[Item, Item]] = []
-                # Two chips
-                for chip1, chip2 in itertools.combinations(chips, 2):
-                    # Can move to floors with no generator, or both matching generators
-                    if dest_gens and not dest_gens.issuperset({chip1, chip2}):
-                        continue
-                    double_items.append((Microchip(chip1), Microchip(chip2)))
-                # Two generators
-                for gen1, gen2 in itertools.combinations(gens, 2):
-                    # Can move to floors with unmatched chips, if they match them...
-                    if unmatched_chips - {gen1, gen2}:
+                there = items_at(state, dest_floor)
+                for moved in moves:
+                    if not (is_safe(here ^ moved) and is_safe(there | moved)):
                         continue
-                    # ... but only if they're not currently protecting their chip
-                    if (gen1 in chips or gen2 in chips) and gens - {gen1, gen2}:
-                        continue
-                    double_items.append((Generator(gen1), Generator(gen2)))
-                # Matching generator and chip
-                for match in chips & gens:
-                    # Can move to floors with no unmatched chips
-                    if not unmatched_chips:
-                        double_items.append((Microchip(match), Generator(match)))
-
-                for item in single_items:
-                    new_items = all_items | {item: dest_floor}
-                    assert new_items.keys() == all_items.keys()  # Sanity check
-                    yield to_state(dest_floor, new_items)
-                for item1, item2 in double_items:
-                    new_items = all_items | {item1: dest_floor, item2: dest_floor}
-                    assert new_items.keys() == all_items.keys()  # Sanity check
-                    yield to_state(dest_floor, new_items)
-
-        def dijkstra(start: State, end: State) -> int:
-            # Priority queue of (distance, point)
-            queue = [(0, start)]
-            seen: set[State] = set()
+                    new_state = state & ((1 << elevator_shift) - 1)
+                    new_state ^= moved << (elevator * width)
+                    new_state |= moved << (dest_floor * width)
+                    new_state |= dest_floor << elevator_shift
+                    yield canonical(new_state)
+
+        def heuristic(state: State) -> int:
+            # At most two items go up with the elevator, and one must come back
+            # down with it: getting `k` items past a floor takes `2k - 3` moves
+            total = 0
+            below = 0
+            for floor in range(NUM_FLOORS - 1):
+                below += items_at(state, floor).bit_count()
+                if below:
+                    total += max(1, 2 * below - 3)
+            return total
+
+        def a_star(start: State, end: State) -> int:
+            # Priority queue of (estimated total, distance, state)
+            queue = [(heuristic(start), 0, start)]
+            distances = {start: 0}
 
             while len(queue) > 0:
-                dist, p = heapq.heappop(queue)
+                _, dist, p = heapq.heappop(queue)
                 if p == end:
                     return dist
-                # We must have seen p with a smaller distance before
-                if p in seen:
+                # We must have found a shorter path to p since it was queued
+                if dist > distances[p]:
                     continue
-                # First time encountering p, must be the smallest distance to it
-                seen.add(p)
-                # Add all neighbours to be visited
+                # Add all neighbours to be visited, if they are now closer
                 for n in neighbours(p):
-                    heapq.heappush(queue, (dist + 1, n))
+                    if dist + 1 >= distances.get(n, dist + 2):
+                        continue
+                    distances[n] = dist + 1
+                    heapq.heappush(queue, (dist + 1 + heuristic(n), dist + 1, n))
 
             assert False  # Sanity check
 
+        start = pack(
+            elevator,
+            [(floors[Microchip(elem)], floors[Generator(elem)]) for elem in elements],
+        )
         # On the end state, we want all items pairs on the top floor
         # The elevator must be on the top floor as well to get the last item up
         top = NUM_FLOORS - 1
-        end = State(top, tuple(State.Floor(top, top) for _ in state.items))
-        return dijkstra(state, end)
+        end = pack(top, [(top, top)] * n)
+        return a_star(start, end)
 
     floors = parse(input)
     for elem in ("elerium", "dilithium"):
         floors[Microchip(elem)] = 0
         floors[Generator(elem)] = 0
-    state = to_state(0, floors)
-    return solve(state)
+    return solve(0, floors)
 
 
 def main() -> None:
@@ -1,35 +1,80 @@
 #!/usr/bin/env python
 
-import functools
+import concurrent.futures
 import hashlib
 import itertools
+import os
+import re
 import sys
+from collections import Counter, deque
+from collections.abc import Iterator
 
+# How many hashes are computed by a worker process at once
+BATCH_SIZE = 256
+# How far ahead of a triplet its quintuplet can be found
+LOOK_AHEAD = 1000
+
+TRIPLET = re.compile(r"(.)\1\1")
+QUINTUPLET = re.compile(r"(.)\1{4}")
+
+# A hash is only ever looked at through its first triplet, and its quintuplets
+HashInfo = tuple[str | None, set[str]]
+
+
+def hash(salt: str, n: int) -> str:
+    return hashlib.md5((salt + str(n)).encode()).hexdigest()
 
-def solve(input: str) -> int:
-    def hash(n: int, salt: str) -> str:
-        return hashlib.md5((salt + str(n)).encode()).hexdigest()
 
-    def find_triplet_char(input: str) -> str | None:
-        for i in range(0, len(input) - 2):
-            a, b, c = input[i], input[i + 1], input[i + 2]
-            if a == b and b == c:
-                return a
-        return None
+def hash_batch(salt: str, start: int) -> list[HashInfo]:
+    res: list[HashInfo] = []
+    for n in range(start, start + BATCH_SIZE):
+        key = hash(salt, n)
+        triplet = TRIPLET.search(key)
+        res.append(
+            (
+                None if triplet is None else triplet[1],
+                set(QUINTUPLET.findall(key)),
+            )
+        )
+    return res
 
+
+def hash_infos(salt: str) -> Iterator[HashInfo]:
+    executor = concurrent.futures.ProcessPoolExecutor()
+    try:
+        batches = (
+            executor.submit(hash_batch, salt, start)
+            for start in itertools.count(0, BATCH_SIZE)
+        )
+        # Keep all workers busy, while yielding results in order
+        in_flight = deque(itertools.islice(batches, 2 * (os.cpu_count() or 1)))
+        while True:
+            yield from in_flight.popleft().result()
+            in_flight.append(next(batches))
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def solve(input: str) -> int:
     salt = input.strip()
-    hashed_salt = functools.cache(functools.partial(hash, salt=salt))
+    infos = hash_infos(salt)
+    # Sliding window over the candidate key, and the hashes following it
+    window = deque(itertools.islice(infos, LOOK_AHEAD + 1))
+    # Quintuplets found in the hashes following the candidate key
+    quintuplets = Counter(
+        c for _, chars in itertools.islice(window, 1, None) for c in chars
+    )
     cur_key = 0
     for i in itertools.count():
-        candidate = hashed_salt(i)
-        if (triplet_char := find_triplet_char(candidate)) is None:
-            continue
-        for j in range(i + 1, i + 1000 + 1):
-            if (triplet_char * 5) in hashed_salt(j):
-                cur_key += 1
-                if cur_key == 64:
-                    return i
-                break
+        triplet_char, _ = window.popleft()
+        if triplet_char is not None and quintuplets[triplet_char] > 0:
+            cur_key += 1
+            if cur_key == 64:
+                return i
+        # Slide the window to the next candidate key
+        quintuplets.subtract(window[0][1])
+        window.append(next(infos))
+        quintuplets.update(window[-1][1])
     assert False  # Sanity check
 
 
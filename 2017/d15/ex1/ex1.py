@@ -1,34 +1,47 @@
 #!/usr/bin/env python
 
-import functools
-import itertools
 import sys
 from collections.abc import Iterator
 
+import numpy as np
+
+MODULUS = 2147483647
+# How many values are generated at once, using skip-ahead multipliers
+BLOCK_SIZE = 1 << 20
+
 
 def solve(input: str) -> int:
     def parse(input: str) -> tuple[int, int]:
         a, b = input.splitlines()
         return int(a.split()[-1]), int(b.split()[-1])
 
-    def generate(seed: int, factor: int) -> int:
-        seed *= factor
-        return seed % 2147483647
-
-    def judge(a: int, b: int) -> bool:
-        mask = (1 << 16) - 1
-        return (a & mask) == (b & mask)
-
-    def iter_judgements(seed_a: int, seed_b: int) -> Iterator[bool]:
-        generate_a = functools.partial(generate, factor=16807)
-        generate_b = functools.partial(generate, factor=48271)
-
+    def skip_ahead(factor: int) -> np.ndarray:
+        # `jumps[i]` is `factor ** (i + 1)`, modulo `MODULUS`
+        jumps = np.array([factor], dtype=np.uint64)
+        while len(jumps) < BLOCK_SIZE:
+            jumps = np.concatenate([jumps, jumps * jumps[-1] % MODULUS])
+        return jumps
+
+    def generate(seed: int, factor: int) -> Iterator[np.ndarray]:
+        # Both operands are below 2**31, their product fits in 64 bits
+        jumps = skip_ahead(factor)
+        block = np.empty_like(jumps)
         while True:
-            seed_a, seed_b = generate_a(seed_a), generate_b(seed_b)
-            yield judge(seed_a, seed_b)
+            np.multiply(jumps, np.uint64(seed), out=block)
+            np.remainder(block, MODULUS, out=block)
+            seed = int(block[-1])
+            yield block.astype(np.uint16)  # Truncation keeps the lowest 16 bits
+
+    def count_judgements(seed_a: int, seed_b: int, count: int) -> int:
+        total = 0
+        blocks = zip(generate(seed_a, 16807), generate(seed_b, 48271))
+        for start, (values_a, values_b) in zip(range(0, count, BLOCK_SIZE), blocks):
+            n = min(BLOCK_SIZE, count - start)
+            total += int(np.count_nonzero(values_a[:n] == values_b[:n]))
+        return total
 
     seed_a, seed_b = parse(input)
-    return sum(itertools.islice(iter_judgements(seed_a, seed_b), 40000000))
+    return count_judgements(seed_a, seed_b, 40000000)
 
 
 def main() -> None:
@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 
-import functools
-import itertools
 import sys
-from collections.abc import Iterator
+
+import numpy as np
+
+MODULUS = 2147483647
+# How many values are generated at once, using skip-ahead multipliers
+BLOCK_SIZE = 1 << 20
 
 
 def solve(input: str) -> int:
@@ -11,27 +14,37 @@ def solve(input: str) -> int:
         a, b = input.splitlines()
         return int(a.split()[-1]), int(b.split()[-1])
 
-    def generate(seed: int, factor: int, criteria: int) -> int:
-        while True:
-            seed *= factor
-            seed %= 2147483647
-            if (seed % criteria) == 0:
-                return seed
-
-    def judge(a: int, b: int) -> bool:
-        mask = (1 << 16) - 1
-        return (a & mask) == (b & mask)
-
-    def iter_judgements(seed_a: int, seed_b: int) -> Iterator[bool]:
-        generate_a = functools.partial(generate, factor=16807, criteria=4)
-        generate_b = functools.partial(generate, factor=48271, criteria=8)
-
-        while True:
-            seed_a, seed_b = generate_a(seed_a), generate_b(seed_b)
-            yield judge(seed_a, seed_b)
+    def skip_ahead(factor: int) -> np.ndarray:
+        # `jumps[i]` is `factor ** (i + 1)`, modulo `MODULUS`
+        jumps = np.array([factor], dtype=np.uint64)
+        while len(jumps) < BLOCK_SIZE:
+            jumps = np.concatenate([jumps, jumps * jumps[-1] % MODULUS])
+        return jumps
+
+    def generate(seed: int, factor: int, criteria: int, count: int) -> np.ndarray:
+        # Both operands are below 2**31, their product fits in 64 bits
+        jumps = skip_ahead(factor)
+        blocks: list[np.ndarray] = []
+        found = 0
+        block = np.empty_like(jumps)
+        while found < count:
+            np.multiply(jumps, np.uint64(seed), out=block)
+            np.remainder(block, MODULUS, out=block)
+            seed = int(block[-1])
+            # Criteria are powers of two, check them with a mask
+            matching = block[(block & (criteria - 1)) == 0]
+            # Truncation keeps the lowest 16 bits
+            blocks.append(matching.astype(np.uint16))
+            found += len(matching)
+        return np.concatenate(blocks)[:count]
+
+    def count_judgements(seed_a: int, seed_b: int, count: int) -> int:
+        values_a = generate(seed_a, 16807, 4, count)
+        values_b = generate(seed_b, 48271, 8, count)
+        return int(np.count_nonzero(values_a == values_b))
 
     seed_a, seed_b = parse(input)
-    return sum(itertools.islice(iter_judgements(seed_a, seed_b), 5000000))
+    return count_judgements(seed_a, seed_b, 5000000)
 
 
 def main() -> None:
@@ -1,7 +1,55 @@
 #!/usr/bin/env python
 
-import collections
 import sys
+from array import array
+from collections.abc import Iterator
+
+# Marbles which are multiples of this number are scored instead of placed
+SCORING_MARBLE = 23
+# How often, in marbles, are the current high scores reported
+CHECKPOINT = 1 << 20
+
+
+# Yields the last marble played and the high score every `checkpoint` marbles,
+# and after the last one
+def play(
+    players: int, last_marble: int, checkpoint: int = CHECKPOINT
+) -> Iterator[tuple[int, int]]:
+    # `links[marble]` is the marble following it clockwise. Marbles are always
+    # placed right after the one following the previous marble, so the marble
+    # 7 places counter-clockwise of `marble - 1` is the one following
+    # `marble - 5`: no need for counter-clockwise links
+    links = array("I", bytes(4 * (last_marble + 1)))
+    scores = [0] * players
+    high_score = 0
+    next_checkpoint = checkpoint
+
+    current = 0
+    for marble in range(SCORING_MARBLE, last_marble + SCORING_MARBLE, SCORING_MARBLE):
+        # Place all marbles up to the next scoring one, each of them going right
+        # after the marble which used to follow the previous one
+        after = links[current]
+        for placed in range(marble - SCORING_MARBLE + 1, min(marble, last_marble + 1)):
+            following = links[after]
+            links[after] = placed
+            links[placed] = following
+            after = following
+        if marble > last_marble:
+            break
+
+        before = marble - 5
+        removed = links[before]
+        current = links[removed]
+        links[before] = current
+        player = marble % players
+        scores[player] += marble + removed
+        high_score = max(high_score, scores[player])
+
+        if marble >= next_checkpoint:
+            yield marble, high_score
+            next_checkpoint += checkpoint
+
+    yield last_marble, max(scores)
 
 
 def solve(input: str) -> int:
@@ -9,25 +57,9 @@ def solve(input: str) -> int:
         split = input.split()
         return int(split[0]), int(split[6])
 
-    def play_game(players: int, last_marble: int) -> list[int]:
-        circle = collections.deque([0])
-        scores = [0] * players
-
-        for marble in range(1, last_marble + 1):
-            if marble % 23 == 0:
-                scores[marble % players] += marble
-                circle.rotate(7)
-                scores[marble % players] += circle.pop()
-                circle.rotate(-1)
-            else:
-                circle.rotate(-1)
-                circle.append(marble)
-
-        return scores
-
     players, last_marble = parse(input)
-    scores = play_game(players, last_marble * 100)
-    return max(scores)
+    *_, (_, high_score) = play(players, last_marble * 100)
+    return high_score
 
 
 def main() -> None:
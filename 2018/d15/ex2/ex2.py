@@ -1,26 +1,8 @@
 #!/usr/bin/env python
 
-import copy
 import dataclasses
 import enum
-import itertools
 import sys
-from typing import Iterator, NamedTuple
-
-
-class Point(NamedTuple):
-    x: int
-    y: int
-
-    # Returned in reading order
-    def neighbours(self) -> Iterator["Point"]:
-        for dx, dy in (
-            (-1, 0),
-            (0, -1),
-            (0, 1),
-            (1, 0),
-        ):
-            yield Point(self.x + dx, self.y + dy)
 
 
 class Unit(enum.StrEnum):
@@ -37,6 +19,8 @@ class Unit(enum.StrEnum):
 
 @dataclasses.dataclass
 class UnitData:
+    type: Unit
+    pos: int
     hp: int = 200
     power: int = 3
 
@@ -46,188 +30,183 @@ class ElfDiedError(Exception):
 
 
 def solve(input: str) -> int:
-    def parse(input: list[str]) -> tuple[set[Point], dict[Unit, set[Point]]]:
-        walls: set[Point] = set()
-        units: dict[Unit, set[Point]] = {u: set() for u in Unit}
-
-        for x, line in enumerate(input):
-            for y, c in enumerate(line):
-                p = Point(x, y)
-                if c in Unit:
-                    units[Unit(c)].add(p)
-                if c == "#":
-                    walls.add(p)
-
-        return walls, units
-
-    def double_bfs(
-        unit_type: Unit,
-        unit_pos: Point,
-        walls: set[Point],
-        units: dict[Unit, set[Point]],
-    ) -> Point | None:
-        def bfs(
-            start: Point,
-            targets: set[Point],
-            blockers: set[Point],
-        ) -> Point | None:
-            frontier = [start]
-            seen: set[Point] = set()
-            while frontier:
-                new_frontier: set[Point] = set()
-
-                for p in frontier:
-                    if p in targets:
-                        return p
-                    seen.add(p)
-                    for n in p.neighbours():
-                        if n in seen:
-                            continue
-                        if n in blockers:
-                            continue
-                        new_frontier.add(n)
-                frontier = sorted(new_frontier)
-
-            return None
-
-        blockers = walls | units[unit_type]
-        ennemies = units[unit_type.ennemy()]
-
-        # First BFS from start to square next to an ennemy
-        targets_in_range = {
-            n for ennemy in ennemies for n in ennemy.neighbours() if n not in blockers
-        }
-        if (target := bfs(unit_pos, targets_in_range, blockers)) is None:
-            return None
-
-        # Then back from chosen target to one of the movement squares
-        movement_squares = {n for n in unit_pos.neighbours() if n not in blockers}
-        return bfs(target, movement_squares, blockers)
-
-    def do_move(
-        unit_type: Unit,
-        unit_pos: Point,
-        walls: set[Point],
-        units: dict[Unit, set[Point]],
-        unit_data: dict[Point, UnitData],
-    ) -> Point:
-        # If already next to an ennemy, do not move
-        if any(n in units[unit_type.ennemy()] for n in unit_pos.neighbours()):
-            return unit_pos
-
-        new_pos = double_bfs(unit_type, unit_pos, walls, units)
-
-        # Nowhere to move to, no-op
-        if new_pos is None:
-            return unit_pos
-
-        assert new_pos != unit_pos  # Sanity check
-        assert unit_pos in units[unit_type]  # Sanity check
-        assert new_pos not in units[unit_type]  # Sanity check
-
-        # Make the movement in-place
-        units[unit_type] ^= {unit_pos, new_pos}
-        unit_data[new_pos] = unit_data.pop(unit_pos)
-
-        return new_pos
-
-    def do_attack(
-        unit_type: Unit,
-        unit_pos: Point,
-        units: dict[Unit, set[Point]],
-        unit_data: dict[Point, UnitData],
-    ) -> None:
-        # Look for an attack target
-        target = min(
-            (n for n in unit_pos.neighbours() if n in units[unit_type.ennemy()]),
-            key=lambda p: unit_data[p].hp,
-            default=None,
-        )
-
-        # If not in range, no-op
-        if target is None:
-            return
-
-        assert target not in units[unit_type]  # Sanity check
-        assert target in units[unit_type.ennemy()]  # Sanity check
-        assert unit_data[target].hp > 0  # Sanity check
-
-        # Make the attack in-place
-        unit_data[target].hp -= unit_data[unit_pos].power
-        # And if we killed it, remove it from `units`
-        if unit_data[target].hp <= 0:
-            if unit_type.ennemy() == Unit.ELF:
-                raise ElfDiedError
-            units[unit_type.ennemy()].remove(target)
-            unit_data.pop(target)
-
-    def turn(
-        walls: set[Point],
-        units: dict[Unit, set[Point]],
-        unit_data: dict[Point, UnitData],
-    ) -> bool:
-        turn_order = sorted((p, u) for u, points in units.items() for p in points)
-        for p, u in turn_order:
-            # Don't do anything if the unit is dead
-            if p not in units[u]:
-                continue
-
-            # If no ennemies left, finish the turn early and indicate that we're done
-            if not units[u.ennemy()]:
-                return False
-
-            # Movements and attacks are made in-place
-            p = do_move(u, p, walls, units, unit_data)
-            do_attack(u, p, units, unit_data)
-
-        return True
-
-    def print_map(walls: set[Point], units: dict[Unit, set[Point]]) -> None:
-        max_x, max_y = max(p.x for p in walls), max(p.y for p in walls)
-        for x in range(0, max_x + 1):
-            for y in range(0, max_y + 1):
-                p = Point(x, y)
-                for u in Unit:
-                    if p in units[u]:
-                        print(str(u), end="")
+    # The map is flattened, cells are numbered in reading order
+    def parse(input: list[str]) -> tuple[int, list[bool], list[tuple[Unit, int]]]:
+        width = len(input[0])
+        walls: list[bool] = []
+        units: list[tuple[Unit, int]] = []
+
+        for line in input:
+            assert len(line) == width  # Sanity check
+            for c in line:
+                if c not in (".", "#"):
+                    units.append((Unit(c), len(walls)))
+                walls.append(c == "#")
+
+        return width, walls, units
+
+    width, walls, start = parse(input.splitlines())
+    # Returned in reading order
+    offsets = (-width, -1, 1, width)
+
+    # BFS buffers, re-used across all searches: a cell was seen by the current
+    # search if it has been stamped with the current `epoch`
+    epoch = 0
+    seen = [0] * len(walls)
+    first_step = [0] * len(walls)
+    queue = [0] * len(walls)
+
+    def fight(elf_power: int) -> int:
+        units = [
+            UnitData(u, p, power=elf_power if u == Unit.ELF else 3) for u, p in start
+        ]
+        occupant: list[UnitData | None] = [None] * len(walls)
+        for unit in units:
+            occupant[unit.pos] = unit
+        alive = {u: sum(unit.type == u for unit in units) for u in Unit}
+
+        def is_open(p: int) -> bool:
+            return not walls[p] and occupant[p] is None
+
+        def next_to_ennemy(p: int, ennemy: Unit) -> bool:
+            for offset in offsets:
+                other = occupant[p + offset]
+                if other is not None and other.type == ennemy:
+                    return True
+            return False
+
+        # The first step towards the closest square in range of an ennemy
+        def find_move(unit: UnitData) -> int | None:
+            nonlocal epoch
+
+            ennemy = unit.type.ennemy()
+            epoch += 1
+            seen[unit.pos] = epoch
+            head, tail = 0, 0
+            # Seeding in reading order means a cell is always first reached
+            # through the first step that comes first in reading order
+            for offset in offsets:
+                n = unit.pos + offset
+                if not is_open(n):
+                    continue
+                seen[n] = epoch
+                first_step[n] = n
+                queue[tail] = n
+                tail += 1
+
+            target: int | None = None
+            layer_end = tail
+            while head < tail:
+                # Only look at the current layer once a target is found
+                if head == layer_end:
+                    if target is not None:
                         break
-                else:
-                    print("#" if p in walls else ".", end="")
-            print()
-        print()
-
-    def run_to_completion(
-        walls: set[Point],
-        units: dict[Unit, set[Point]],
-        unit_data: dict[Point, UnitData],
-    ) -> int:
+                    layer_end = tail
+                p = queue[head]
+                head += 1
+                if next_to_ennemy(p, ennemy):
+                    if target is None or p < target:
+                        target = p
+                    continue
+                for offset in offsets:
+                    n = p + offset
+                    if seen[n] == epoch or not is_open(n):
+                        continue
+                    seen[n] = epoch
+                    first_step[n] = first_step[p]
+                    queue[tail] = n
+                    tail += 1
+
+            if target is None:
+                return None
+            return first_step[target]
+
+        def do_move(unit: UnitData) -> None:
+            # If already next to an ennemy, do not move
+            if next_to_ennemy(unit.pos, unit.type.ennemy()):
+                return
+
+            # Nowhere to move to, no-op
+            if (new_pos := find_move(unit)) is None:
+                return
+
+            assert occupant[new_pos] is None  # Sanity check
+            occupant[unit.pos], occupant[new_pos] = None, unit
+            unit.pos = new_pos
+
+        def do_attack(unit: UnitData) -> None:
+            ennemy = unit.type.ennemy()
+            # Look for an attack target, ties broken in reading order
+            target: UnitData | None = None
+            for offset in offsets:
+                other = occupant[unit.pos + offset]
+                if other is None or other.type != ennemy:
+                    continue
+                if target is None or other.hp < target.hp:
+                    target = other
+
+            # If not in range, no-op
+            if target is None:
+                return
+
+            assert target.hp > 0  # Sanity check
+
+            target.hp -= unit.power
+            # And if we killed it, remove it from the map
+            if target.hp <= 0:
+                # No need to go on with a losing battle
+                if target.type == Unit.ELF:
+                    raise ElfDiedError
+                occupant[target.pos] = None
+                alive[target.type] -= 1
+
+        def turn() -> bool:
+            units.sort(key=lambda unit: unit.pos)
+            for unit in units:
+                # Don't do anything if the unit is dead
+                if unit.hp <= 0:
+                    continue
+
+                # If no ennemies left, finish the turn early and indicate that we're done
+                if not alive[unit.type.ennemy()]:
+                    return False
+
+                do_move(unit)
+                do_attack(unit)
+
+            return True
+
         turns = 0
-        while turn(walls, units, unit_data):
+        while turn():
             turns += 1
-        return turns * sum(data.hp for data in unit_data.values())
+        return turns * sum(unit.hp for unit in units if unit.hp > 0)
 
-    def arm_elves(
-        walls: set[Point],
-        units: dict[Unit, set[Point]],
-    ) -> int:
-        for elf_power in itertools.count(start=3):
+    def arm_elves() -> int:
+        outcomes: dict[int, int] = {}
+
+        def elves_win(elf_power: int) -> bool:
             try:
-                unit_data = {
-                    p: UnitData(power=elf_power if u == Unit.ELF else 3)
-                    for u, points in units.items()
-                    for p in points
-                }
-                return run_to_completion(
-                    copy.deepcopy(walls),
-                    copy.deepcopy(units),
-                    unit_data,
-                )
+                outcomes[elf_power] = fight(elf_power)
+                return True
             except ElfDiedError:
-                pass
-        assert False  # Sanity check
+                return False
+
+        # Exponential search for a winning power...
+        low, high = 2, 3
+        while not elves_win(high):
+            low, high = high, high * 2
+
+        # ... Then binary search for the lowest one
+        while high - low > 1:
+            mid = (low + high) // 2
+            if elves_win(mid):
+                high = mid
+            else:
+                low = mid
+
+        return outcomes[high]
 
-    walls, units = parse(input.splitlines())
-    return arm_elves(walls, units)
+    return arm_elves()
 
 
 def main() -> None:
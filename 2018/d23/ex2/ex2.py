@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 
+import heapq
+import itertools
 import sys
 from typing import NamedTuple
 
-import z3
+import numpy as np
+
+# Offsets of the 8 sub-boxes of a box, in units of their size
+OCTANTS = np.array(list(itertools.product((0, 1), repeat=3)), dtype=np.int64)
 
 
 class Point(NamedTuple):
@@ -30,33 +35,46 @@ def solve(input: str) -> int:
     def dist(lhs: Point, rhs: Point) -> int:
         return sum(abs(l - r) for l, r in zip(lhs, rhs))
 
+    # Octree search, exploring the most promising boxes first
     def find_best(bots: list[NanoBot]) -> Point:
-        def z3_abs(n: z3.ArithRef) -> z3.ArithRef:
-            return z3.If(n > 0, n, -n)  # type: ignore
-
-        def z3_dist(lhs: tuple[z3.ArithRef, ...], rhs: Point) -> z3.ArithRef:
-            return sum(z3_abs(l - r) for l, r in zip(lhs, rhs))  # type: ignore
-
-        pos = tuple(z3.Int(c) for c in ("x", "y", "z"))
-
-        in_range = [z3.Int(f"in_range_{i}") for i in range(len(bots))]
-        total = z3.Int("total")
-        optimizer = z3.Optimize()
-
-        for i, bot in enumerate(bots):
-            optimizer.add(in_range[i] == (z3_dist(pos, bot.pos) <= bot.r))
-        optimizer.add(total == sum(in_range))
-
-        dist_to_origin = z3.Int("dist_to_origin")
-        optimizer.add(dist_to_origin == z3_dist(pos, Point(0, 0, 0)))
-
-        optimizer.maximize(total)
-        optimizer.minimize(dist_to_origin)
-
-        assert optimizer.check() == z3.sat  # Sanity check
-        model = optimizer.model()
-
-        return Point(*(map(lambda v: model.eval(v).as_long(), pos)))  # type: ignore
+        centers = np.array([bot.pos for bot in bots], dtype=np.int64)
+        radii = np.array([bot.r for bot in bots], dtype=np.int64)
+
+        # Number of bots in range of at least one point of each box
+        def in_range(lows: np.ndarray, size: int) -> np.ndarray:
+            highs = lows + size - 1
+            below = np.maximum(lows[:, np.newaxis, :] - centers, 0)
+            above = np.maximum(centers - highs[:, np.newaxis, :], 0)
+            distances = (below + above).sum(axis=-1)
+            return (distances <= radii).sum(axis=-1)
+
+        # Distance from the origin to the closest point of the box
+        def dist_to_origin(low: Point, size: int) -> int:
+            return sum(max(0, n, -(n + size - 1)) for n in low)
+
+        # Start from a box containing all bots' ranges and the origin, with a
+        # power of two as size
+        lows = np.minimum((centers - radii[:, np.newaxis]).min(axis=0), 0)
+        highs = np.maximum((centers + radii[:, np.newaxis]).max(axis=0), 0)
+        low = Point(*lows.tolist())
+        span = int((highs - lows).max()) + 1
+        size = 1 << (span - 1).bit_length()
+
+        # Most bots in range first, then closest to the origin, then smallest
+        queue = [(-len(bots), dist_to_origin(low, size), size, low)]
+        while queue:
+            _, _, size, low = heapq.heappop(queue)
+            # Bounds are exact on a single point, no other box can do better
+            if size == 1:
+                return low
+            size //= 2
+            children = np.array(low) + OCTANTS * size
+            for child, count in zip(children.tolist(), in_range(children, size)):
+                child = Point(*child)
+                entry = (-int(count), dist_to_origin(child, size), size, child)
+                heapq.heappush(queue, entry)
+
+        assert False  # Sanity check
 
     bots = parse(input.splitlines())
     return dist(find_best(bots), Point(0, 0, 0))
@@ -1,198 +1,204 @@
 #!/usr/bin/env python
 
-from dataclasses import dataclass
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from enum import IntEnum
-from typing import List, NamedTuple
+from typing import ClassVar
 
 
 class ParameterMode(IntEnum):
     POSITION = 0  # Acts on address
     IMMEDIATE = 1  # Acts on the immediate value
+    RELATIVE = 2  # Acts on offset to relative base
 
 
-class Instruction(NamedTuple):
-    address: int  # The address of the instruction, for convenience
-    op: int  # The opcode
-    p1_mode: ParameterMode  # Which mode is the first parameter in
-    p2_mode: ParameterMode  # Which mode is the second parameter in
-    p3_mode: ParameterMode  # Which mode is the third parameter in
+# Size of the sparse memory pages, allocated past the program image
+PAGE_SIZE = 1024
 
 
-def lookup_ops(index: int, memory: List[int]) -> Instruction:
-    digits = list(map(int, str(memory[index])))
-    a, b, c, d, e = [0] * (5 - len(digits)) + digits  # Pad with default values
-    return Instruction(
-        address=index,
-        op=d * 10 + e,
-        p1_mode=ParameterMode(c),
-        p2_mode=ParameterMode(b),
-        p3_mode=ParameterMode(a),
-    )
+# The modes of an instruction's three parameters
+Modes = tuple[ParameterMode, ParameterMode, ParameterMode]
+# A decoded instruction: its handler, and the modes of its parameters
+Instruction = tuple[Callable[["Computer", int, Modes], int], Modes]
 
 
 @dataclass
 class Computer:
-    memory: List[int]  # Memory space
+    memory: list[int]  # Program image, dense memory space
     rip: int = 0  # Instruction pointer
+    input_list: deque[int] = field(default_factory=deque)
+    output_list: list[int] = field(default_factory=list)
+    is_halted: bool = field(default=False, init=False)
+    relative_base: int = field(default=0, init=False)
+    steps: int = field(default=0, init=False)  # Number of instructions executed
+    # Sparse memory past the program image, allocated one page at a time
+    _pages: dict[int, list[int]] = field(default_factory=dict, init=False, repr=False)
+    # Pages which are not shared with a fork, and can be written to in place
+    _owned_pages: set[int] = field(default_factory=set, init=False, repr=False)
+    # Cache of decoded instructions, keyed by address, invalidated on writes
+    _decoded: dict[int, Instruction] = field(
+        default_factory=dict, init=False, repr=False
+    )
 
-    def run(self):
+    # Run until halted, or blocked waiting on input: check `is_halted` to know which
+    def run(self) -> None:
+        decoded = self._decoded
+        rip = self.rip
+        steps = self.steps
         while True:
-            instr = lookup_ops(self.rip, self.memory)
-            if instr.op == 99:  # Halt
-                return
-            elif instr.op == 1:  # Sum
-                self.do_addition(instr)
-            elif instr.op == 2:  # Multiplication
-                self.do_multiplication(instr)
-            elif instr.op == 3:  # Load from input
-                self.do_input(instr)
-            elif instr.op == 4:  # Store to output
-                self.do_output(instr)
-            elif instr.op == 5:  # Jump if true
-                self.do_jump_if_true(instr)
-            elif instr.op == 6:  # Jump if false
-                self.do_jump_if_false(instr)
-            elif instr.op == 7:  # Less than
-                self.do_less_than(instr)
-            elif instr.op == 8:  # Equal to
-                self.do_equal_to(instr)
-            else:
-                assert False  # Sanity check
-
-    def do_addition(self, instr: Instruction) -> None:
-        lhs, rhs, dest = self.memory[instr.address + 1 : instr.address + 4]
-
-        if instr.p1_mode == ParameterMode.POSITION:
-            lhs = self.memory[lhs]
-        else:
-            assert instr.p1_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if instr.p2_mode == ParameterMode.POSITION:
-            rhs = self.memory[rhs]
+            if (instr := decoded.get(rip)) is None:
+                instr = decoded[rip] = self._decode(rip)
+            handler, modes = instr
+            next_rip = handler(self, rip, modes)
+            if next_rip < 0:  # Halted, or waiting on input
+                break
+            steps += 1
+            rip = next_rip
+        self.rip = rip
+        self.steps = steps
+
+    # Snapshot the machine, memory pages are shared until either one writes to them
+    def fork(self) -> "Computer":
+        self._owned_pages.clear()  # Pages are now shared with the fork
+        fork = Computer(
+            self.memory.copy(),
+            self.rip,
+            deque(self.input_list),
+            self.output_list.copy(),
+        )
+        fork.is_halted = self.is_halted
+        fork.relative_base = self.relative_base
+        fork.steps = self.steps
+        fork._pages = self._pages.copy()
+        fork._decoded = self._decoded.copy()
+        return fork
+
+    def _decode(self, address: int) -> Instruction:
+        modes, op = divmod(self._read(address), 100)
+        return self._OPS[op], (
+            ParameterMode(modes % 10),
+            ParameterMode(modes // 10 % 10),
+            ParameterMode(modes // 100),
+        )
+
+    def _address(self, mode: ParameterMode, address: int) -> int:
+        if mode == ParameterMode.IMMEDIATE:
+            return address
+        if mode == ParameterMode.RELATIVE:
+            return self.relative_base + self._read(address)
+        return self._read(address)
+
+    def _read(self, address: int) -> int:
+        assert address >= 0  # Sanity check
+        if address < len(self.memory):
+            return self.memory[address]
+        page = self._pages.get(address // PAGE_SIZE)
+        return 0 if page is None else page[address % PAGE_SIZE]
+
+    def _write(self, address: int, value: int) -> None:
+        assert address >= 0  # Sanity check
+        if address < len(self.memory):
+            self.memory[address] = value
         else:
-            assert instr.p2_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        assert instr.p3_mode == ParameterMode.POSITION  # Sanity check
-        self.memory[dest] = lhs + rhs
-
-        self.rip += 4  # Length of the instruction
-
-    def do_multiplication(self, instr: Instruction) -> None:
-        lhs, rhs, dest = self.memory[instr.address + 1 : instr.address + 4]
-
-        if instr.p1_mode == ParameterMode.POSITION:
-            lhs = self.memory[lhs]
-        else:
-            assert instr.p1_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if instr.p2_mode == ParameterMode.POSITION:
-            rhs = self.memory[rhs]
-        else:
-            assert instr.p2_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        assert instr.p3_mode == ParameterMode.POSITION  # Sanity check
-        self.memory[dest] = lhs * rhs
-
-        self.rip += 4  # Length of the instruction
-
-    def do_input(self, instr: Instruction) -> None:
-        value = int(input())
-        param = self.memory[instr.address + 1]
-
-        assert instr.p1_mode == ParameterMode.POSITION  # Sanity check
-        self.memory[param] = value
-
-        self.rip += 2  # Length of the instruction
-
-    def do_output(self, instr: Instruction) -> None:
-        value = self.memory[instr.address + 1]
-        if instr.p1_mode == ParameterMode.POSITION:
-            value = self.memory[value]
-        else:
-            assert instr.p1_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        print(value)
-
-        self.rip += 2  # Length of the instruction
-
-    def do_jump_if_true(self, instr: Instruction) -> None:
-        cond, value = self.memory[instr.address + 1 : instr.address + 3]
-
-        if instr.p1_mode == ParameterMode.POSITION:
-            cond = self.memory[cond]
-        else:
-            assert instr.p1_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if instr.p2_mode == ParameterMode.POSITION:
-            value = self.memory[value]
-        else:
-            assert instr.p2_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if cond != 0:
-            self.rip = value
-        else:
-            self.rip += 3  # Length of the instruction
-
-    def do_jump_if_false(self, instr: Instruction) -> None:
-        cond, value = self.memory[instr.address + 1 : instr.address + 3]
-
-        if instr.p1_mode == ParameterMode.POSITION:
-            cond = self.memory[cond]
-        else:
-            assert instr.p1_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if instr.p2_mode == ParameterMode.POSITION:
-            value = self.memory[value]
-        else:
-            assert instr.p2_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if cond == 0:
-            self.rip = value
-        else:
-            self.rip += 3  # Length of the instruction
-
-    def do_less_than(self, instr: Instruction) -> None:
-        lhs, rhs, dest = self.memory[instr.address + 1 : instr.address + 4]
-
-        if instr.p1_mode == ParameterMode.POSITION:
-            lhs = self.memory[lhs]
-        else:
-            assert instr.p1_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if instr.p2_mode == ParameterMode.POSITION:
-            rhs = self.memory[rhs]
-        else:
-            assert instr.p2_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        assert instr.p3_mode == ParameterMode.POSITION  # Sanity check
-        self.memory[dest] = 1 if lhs < rhs else 0
-
-        self.rip += 4  # Length of the instruction
-
-    def do_equal_to(self, instr: Instruction) -> None:
-        lhs, rhs, dest = self.memory[instr.address + 1 : instr.address + 4]
-
-        if instr.p1_mode == ParameterMode.POSITION:
-            lhs = self.memory[lhs]
-        else:
-            assert instr.p1_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        if instr.p2_mode == ParameterMode.POSITION:
-            rhs = self.memory[rhs]
-        else:
-            assert instr.p2_mode == ParameterMode.IMMEDIATE  # Sanity check
-
-        assert instr.p3_mode == ParameterMode.POSITION  # Sanity check
-        self.memory[dest] = 1 if lhs == rhs else 0
-
-        self.rip += 4  # Length of the instruction
+            index = address // PAGE_SIZE
+            page = self._pages.get(index)
+            if page is None:
+                page = self._pages[index] = [0] * PAGE_SIZE
+                self._owned_pages.add(index)
+            elif index not in self._owned_pages:
+                # Copy the page on the first write since it was shared by a fork
+                page = self._pages[index] = page.copy()
+                self._owned_pages.add(index)
+            page[address % PAGE_SIZE] = value
+        # Self-modifying code must be decoded again
+        self._decoded.pop(address, None)
+
+    def _do_halt(self, rip: int, modes: Modes) -> int:
+        self.is_halted = True
+        return -1
+
+    def _do_addition(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), lhs + rhs)
+        return rip + 4  # Length of the instruction
+
+    def _do_multiplication(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), lhs * rhs)
+        return rip + 4  # Length of the instruction
+
+    def _do_input(self, rip: int, modes: Modes) -> int:
+        if not self.input_list:
+            return -1  # No input, block until an input is provided
+        self._write(self._address(modes[0], rip + 1), self.input_list.popleft())
+        return rip + 2  # Length of the instruction
+
+    def _do_output(self, rip: int, modes: Modes) -> int:
+        self.output_list.append(self._read(self._address(modes[0], rip + 1)))
+        return rip + 2  # Length of the instruction
+
+    def _do_jump_if_true(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, _ = modes
+        if self._read(self._address(p1_mode, rip + 1)) != 0:
+            return self._read(self._address(p2_mode, rip + 2))
+        return rip + 3  # Length of the instruction
+
+    def _do_jump_if_false(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, _ = modes
+        if self._read(self._address(p1_mode, rip + 1)) == 0:
+            return self._read(self._address(p2_mode, rip + 2))
+        return rip + 3  # Length of the instruction
+
+    def _do_less_than(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), 1 if lhs < rhs else 0)
+        return rip + 4  # Length of the instruction
+
+    def _do_equal_to(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), 1 if lhs == rhs else 0)
+        return rip + 4  # Length of the instruction
+
+    def _do_change_relative_base(self, rip: int, modes: Modes) -> int:
+        self.relative_base += self._read(self._address(modes[0], rip + 1))
+        return rip + 2  # Length of the instruction
+
+    # Flat dispatch table, from opcode to handler
+    _OPS: ClassVar[dict[int, Callable[["Computer", int, Modes], int]]] = {
+        1: _do_addition,
+        2: _do_multiplication,
+        3: _do_input,
+        4: _do_output,
+        5: _do_jump_if_true,
+        6: _do_jump_if_false,
+        7: _do_less_than,
+        8: _do_equal_to,
+        9: _do_change_relative_base,
+        99: _do_halt,
+    }
 
 
 def main() -> None:
     with open("input") as mem_f:
         memory = [int(n) for n in mem_f.read().split(",")]
         computer = Computer(memory)
-        computer.run()
+        while True:
+            computer.run()
+            for value in computer.output_list:
+                print(value)
+            computer.output_list.clear()
+            if computer.is_halted:
+                break
+            computer.input_list.append(int(input()))
 
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
 #!/usr/bin/env python
 
 import sys
+from collections import deque
+from collections.abc import Callable
 from copy import deepcopy
 from dataclasses import dataclass, field
 from enum import IntEnum
-from typing import List, NamedTuple
+from typing import ClassVar
 
 
 class ParameterMode(IntEnum):
@@ -13,195 +15,185 @@ class ParameterMode(IntEnum):
     RELATIVE = 2  # Acts on offset to relative base
 
 
-class Instruction(NamedTuple):
-    address: int  # The address of the instruction, for convenience
-    op: int  # The opcode
-    p1_mode: ParameterMode  # Which mode is the first parameter in
-    p2_mode: ParameterMode  # Which mode is the second parameter in
-    p3_mode: ParameterMode  # Which mode is the third parameter in
+# Size of the sparse memory pages, allocated past the program image
+PAGE_SIZE = 1024
 
 
-def lookup_ops(index: int, memory: List[int]) -> Instruction:
-    digits = list(map(int, str(memory[index])))
-    a, b, c, d, e = [0] * (5 - len(digits)) + digits  # Pad with default values
-    return Instruction(
-        address=index,
-        op=d * 10 + e,
-        p1_mode=ParameterMode(c),
-        p2_mode=ParameterMode(b),
-        p3_mode=ParameterMode(a),
-    )
-
-
-class InputInterrupt(Exception):
-    pass
-
-
-class OutputInterrupt(Exception):
-    pass
+# The modes of an instruction's three parameters
+Modes = tuple[ParameterMode, ParameterMode, ParameterMode]
+# A decoded instruction: its handler, and the modes of its parameters
+Instruction = tuple[Callable[["Computer", int, Modes], int], Modes]
 
 
 @dataclass
 class Computer:
-    memory: List[int]  # Memory space
+    memory: list[int]  # Program image, dense memory space
     rip: int = 0  # Instruction pointer
-    input_list: List[int] = field(default_factory=list)
-    output_list: List[int] = field(default_factory=list)
+    input_list: deque[int] = field(default_factory=deque)
+    output_list: list[int] = field(default_factory=list)
     is_halted: bool = field(default=False, init=False)
     relative_base: int = field(default=0, init=False)
+    steps: int = field(default=0, init=False)  # Number of instructions executed
+    # Sparse memory past the program image, allocated one page at a time
+    _pages: dict[int, list[int]] = field(default_factory=dict, init=False, repr=False)
+    # Pages which are not shared with a fork, and can be written to in place
+    _owned_pages: set[int] = field(default_factory=set, init=False, repr=False)
+    # Cache of decoded instructions, keyed by address, invalidated on writes
+    _decoded: dict[int, Instruction] = field(
+        default_factory=dict, init=False, repr=False
+    )
 
+    # Run until halted, or blocked waiting on input: check `is_halted` to know which
     def run(self) -> None:
-        while not self.is_halted:
-            self.run_single()
-
-    def run_no_output_interrupt(self) -> None:
-        while not self.is_halted:
-            try:
-                self.run_single()
-            except OutputInterrupt:
-                continue
-
-    def run_single(self):  # Returns True when halted
-        instr = lookup_ops(self.rip, self.memory)
-        if instr.op == 99:  # Halt
-            self.is_halted = True
-        elif instr.op == 1:  # Sum
-            self._do_addition(instr)
-        elif instr.op == 2:  # Multiplication
-            self._do_multiplication(instr)
-        elif instr.op == 3:  # Load from input
-            self._do_input(instr)
-        elif instr.op == 4:  # Store to output
-            self._do_output(instr)
-        elif instr.op == 5:  # Jump if true
-            self._do_jump_if_true(instr)
-        elif instr.op == 6:  # Jump if false
-            self._do_jump_if_false(instr)
-        elif instr.op == 7:  # Less than
-            self._do_less_than(instr)
-        elif instr.op == 8:  # Equal to
-            self._do_equal_to(instr)
-        elif instr.op == 9:  # Change relative base
-            self._do_change_relative_base(instr)
-        else:
-            assert False  # Sanity check
-
-    def _fill_to_addres(self, address: int) -> None:
-        values = address - len(self.memory) + 1
-        if values <= 0:
-            return
-        for __ in range(values):
-            self.memory.append(0)
-
-    def _get_value(self, mode: ParameterMode, val: int) -> int:
-        if mode == ParameterMode.POSITION:
-            assert 0 <= val  # Sanity check
-            self._fill_to_addres(val)
-            return self.memory[val]
-        elif mode == ParameterMode.RELATIVE:
-            val += self.relative_base
-            assert 0 <= val  # Sanity check
-            self._fill_to_addres(val)
-            return self.memory[val]
-        assert mode == ParameterMode.IMMEDIATE  # Sanity check
-        return val
-
-    def _set_value(self, mode: ParameterMode, address: int, value: int) -> None:
+        decoded = self._decoded
+        rip = self.rip
+        steps = self.steps
+        while True:
+            if (instr := decoded.get(rip)) is None:
+                instr = decoded[rip] = self._decode(rip)
+            handler, modes = instr
+            next_rip = handler(self, rip, modes)
+            if next_rip < 0:  # Halted, or waiting on input
+                break
+            steps += 1
+            rip = next_rip
+        self.rip = rip
+        self.steps = steps
+
+    # Snapshot the machine, memory pages are shared until either one writes to them
+    def fork(self) -> "Computer":
+        self._owned_pages.clear()  # Pages are now shared with the fork
+        fork = Computer(
+            self.memory.copy(),
+            self.rip,
+            deque(self.input_list),
+            self.output_list.copy(),
+        )
+        fork.is_halted = self.is_halted
+        fork.relative_base = self.relative_base
+        fork.steps = self.steps
+        fork._pages = self._pages.copy()
+        fork._decoded = self._decoded.copy()
+        return fork
+
+    def _decode(self, address: int) -> Instruction:
+        modes, op = divmod(self._read(address), 100)
+        return self._OPS[op], (
+            ParameterMode(modes % 10),
+            ParameterMode(modes // 10 % 10),
+            ParameterMode(modes // 100),
+        )
+
+    def _address(self, mode: ParameterMode, address: int) -> int:
+        if mode == ParameterMode.IMMEDIATE:
+            return address
         if mode == ParameterMode.RELATIVE:
-            address += self.relative_base
-        else:
-            assert mode == ParameterMode.POSITION  # Sanity check
+            return self.relative_base + self._read(address)
+        return self._read(address)
 
+    def _read(self, address: int) -> int:
         assert address >= 0  # Sanity check
-        self._fill_to_addres(address)
-
-        self.memory[address] = value
-
-    def _do_addition(self, instr: Instruction) -> None:
-        lhs = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-        rhs = self._get_value(instr.p2_mode, self.memory[instr.address + 2])
-        dest = self.memory[instr.address + 3]
-
-        self._set_value(instr.p3_mode, dest, lhs + rhs)
-
-        self.rip += 4  # Length of the instruction
-
-    def _do_multiplication(self, instr: Instruction) -> None:
-        lhs = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-        rhs = self._get_value(instr.p2_mode, self.memory[instr.address + 2])
-        dest = self.memory[instr.address + 3]
-
-        self._set_value(instr.p3_mode, dest, lhs * rhs)
-
-        self.rip += 4  # Length of the instruction
-
-    def _do_input(self, instr: Instruction) -> None:
-        if len(self.input_list) == 0:
-            raise InputInterrupt  # No input, halt until an input is provided
-
-        value = int(self.input_list.pop(0))
-        param = self.memory[instr.address + 1]
-
-        self._set_value(instr.p1_mode, param, value)
+        if address < len(self.memory):
+            return self.memory[address]
+        page = self._pages.get(address // PAGE_SIZE)
+        return 0 if page is None else page[address % PAGE_SIZE]
 
-        self.rip += 2  # Length of the instruction
-
-    def _do_output(self, instr: Instruction) -> None:
-        value = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-
-        self.output_list.append(value)
-
-        self.rip += 2  # Length of the instruction
-        raise OutputInterrupt  # Alert that we got an output to give
-
-    def _do_jump_if_true(self, instr: Instruction) -> None:
-        cond = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-        value = self._get_value(instr.p2_mode, self.memory[instr.address + 2])
-
-        if cond != 0:
-            self.rip = value
-        else:
-            self.rip += 3  # Length of the instruction
-
-    def _do_jump_if_false(self, instr: Instruction) -> None:
-        cond = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-        value = self._get_value(instr.p2_mode, self.memory[instr.address + 2])
-
-        if cond == 0:
-            self.rip = value
+    def _write(self, address: int, value: int) -> None:
+        assert address >= 0  # Sanity check
+        if address < len(self.memory):
+            self.memory[address] = value
         else:
-            self.rip += 3  # Length of the instruction
-
-    def _do_less_than(self, instr: Instruction) -> None:
-        lhs = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-        rhs = self._get_value(instr.p2_mode, self.memory[instr.address + 2])
-        dest = self.memory[instr.address + 3]
-
-        self._set_value(instr.p3_mode, dest, 1 if lhs < rhs else 0)
-
-        self.rip += 4  # Length of the instruction
-
-    def _do_equal_to(self, instr: Instruction) -> None:
-        lhs = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-        rhs = self._get_value(instr.p2_mode, self.memory[instr.address + 2])
-        dest = self.memory[instr.address + 3]
-
-        self._set_value(instr.p3_mode, dest, 1 if lhs == rhs else 0)
-
-        self.rip += 4  # Length of the instruction
-
-    def _do_change_relative_base(self, instr: Instruction) -> None:
-        value = self._get_value(instr.p1_mode, self.memory[instr.address + 1])
-
-        self.relative_base += value
-        self.rip += 2  # Length of the instruction
+            index = address // PAGE_SIZE
+            page = self._pages.get(index)
+            if page is None:
+                page = self._pages[index] = [0] * PAGE_SIZE
+                self._owned_pages.add(index)
+            elif index not in self._owned_pages:
+                # Copy the page on the first write since it was shared by a fork
+                page = self._pages[index] = page.copy()
+                self._owned_pages.add(index)
+            page[address % PAGE_SIZE] = value
+        # Self-modifying code must be decoded again
+        self._decoded.pop(address, None)
+
+    def _do_halt(self, rip: int, modes: Modes) -> int:
+        self.is_halted = True
+        return -1
+
+    def _do_addition(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), lhs + rhs)
+        return rip + 4  # Length of the instruction
+
+    def _do_multiplication(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), lhs * rhs)
+        return rip + 4  # Length of the instruction
+
+    def _do_input(self, rip: int, modes: Modes) -> int:
+        if not self.input_list:
+            return -1  # No input, block until an input is provided
+        self._write(self._address(modes[0], rip + 1), self.input_list.popleft())
+        return rip + 2  # Length of the instruction
+
+    def _do_output(self, rip: int, modes: Modes) -> int:
+        self.output_list.append(self._read(self._address(modes[0], rip + 1)))
+        return rip + 2  # Length of the instruction
+
+    def _do_jump_if_true(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, _ = modes
+        if self._read(self._address(p1_mode, rip + 1)) != 0:
+            return self._read(self._address(p2_mode, rip + 2))
+        return rip + 3  # Length of the instruction
+
+    def _do_jump_if_false(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, _ = modes
+        if self._read(self._address(p1_mode, rip + 1)) == 0:
+            return self._read(self._address(p2_mode, rip + 2))
+        return rip + 3  # Length of the instruction
+
+    def _do_less_than(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), 1 if lhs < rhs else 0)
+        return rip + 4  # Length of the instruction
+
+    def _do_equal_to(self, rip: int, modes: Modes) -> int:
+        p1_mode, p2_mode, p3_mode = modes
+        lhs = self._read(self._address(p1_mode, rip + 1))
+        rhs = self._read(self._address(p2_mode, rip + 2))
+        self._write(self._address(p3_mode, rip + 3), 1 if lhs == rhs else 0)
+        return rip + 4  # Length of the instruction
+
+    def _do_change_relative_base(self, rip: int, modes: Modes) -> int:
+        self.relative_base += self._read(self._address(modes[0], rip + 1))
+        return rip + 2  # Length of the instruction
+
+    # Flat dispatch table, from opcode to handler
+    _OPS: ClassVar[dict[int, Callable[["Computer", int, Modes], int]]] = {
+        1: _do_addition,
+        2: _do_multiplication,
+        3: _do_input,
+        4: _do_output,
+        5: _do_jump_if_true,
+        6: _do_jump_if_false,
+        7: _do_less_than,
+        8: _do_equal_to,
+        9: _do_change_relative_base,
+        99: _do_halt,
+    }
 
 
 def main() -> None:
     memory = [int(n) for n in sys.stdin.read().split(",")]
-    computer = Computer(deepcopy(memory), input_list=[2])
+    computer = Computer(deepcopy(memory), input_list=deque([2]))
 
-    computer.run_no_output_interrupt()
+    computer.run()
     print(computer.output_list.pop())
     assert len(computer.output_list) == 0  # Sanity check
 
@@ -1,129 +1,121 @@
 #!/usr/bin/env python
 import heapq
 import sys
-from collections import defaultdict, deque
-from dataclasses import dataclass
-from functools import lru_cache
-from math import inf
-from typing import DefaultDict, Deque, Dict, FrozenSet, Iterator, List, Tuple, Union
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Tuple
 
 RawGrid = List[str]
-GraphInfo = List[Tuple[str, int]]
-Graph = Dict[str, GraphInfo]
 
 
-@dataclass(eq=True, frozen=True)  # Hash-able
-class Position:
-    x: int
-    y: int
+class KeyInfo(NamedTuple):
+    key: str
+    distance: int
+    # Bitmask of the keys needed to get to it: to open doors, or found on the way
+    required: int
 
 
-def neighbours(grid: RawGrid, pos: Position) -> Iterator[Position]:
-    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-        new_pos = Position(pos.x + dx, pos.y + dy)
-        if not (0 <= new_pos.x < len(grid) and 0 <= new_pos.y < len(grid[0])):
-            continue
-        if grid[new_pos.x][new_pos.y] == "#":
-            continue
-        yield new_pos
+GraphInfo = List[KeyInfo]
+Graph = Dict[str, GraphInfo]
+
 
+def key_mask(cell: str) -> int:
+    return 1 << (ord(cell.lower()) - ord("a"))
 
-def find_adjacent(grid: RawGrid, pos: Position) -> GraphInfo:
-    queue: Deque[Tuple[Position, int]] = deque()
-    visited = {pos}
-    adjacent: GraphInfo = []
 
-    for n in neighbours(grid, pos):
-        queue.append((n, 1))  # Distance is 1
+# The maze is flattened, and always surrounded by walls
+def find_keys(maze: str, width: int, pos: int) -> GraphInfo:
+    queue: Deque[Tuple[int, int, int]] = deque([(pos, 0, 0)])
+    # For each cell, the keys required by the routes already found to it
+    visited: Dict[int, List[int]] = {pos: [0]}
+    keys: GraphInfo = []
 
     while queue:
-        n, d = queue.popleft()
-        if n in visited:
-            continue
-        visited |= {n}
-        cell = grid[n.x][n.y]
+        n, d, required = queue.popleft()
+        cell = maze[n]
 
-        if cell not in "#.1234":  # We don't care about those
-            adjacent.append((cell, d))
-            continue  # Do not go through doors and keys
+        if cell.islower() and n != pos:
+            keys.append(KeyInfo(cell, d, required))
+        # Going past a door or a key means we need to have found that key
+        if cell.isalpha() and n != pos:
+            required |= key_mask(cell)
 
-        for neighbour in neighbours(grid, n):
-            queue.append((neighbour, d + 1))
+        for neighbour in (n + 1, n - 1, n + width, n - width):
+            if maze[neighbour] == "#":
+                continue
+            # A longer route is only useful if it avoids some door or key
+            routes = visited.setdefault(neighbour, [])
+            if any(other & ~required == 0 for other in routes):
+                continue
+            routes.append(required)
+            queue.append((neighbour, d + 1, required))
 
-    return adjacent
+    return keys
 
 
 def build_graph(grid: RawGrid) -> Graph:
+    maze = "".join(grid)
+    width = len(grid[0])
+    assert all(len(row) == width for row in grid)  # Sanity check
     graph = {}
 
-    for x, row in enumerate(grid):
-        for y, cell in enumerate(row):
-            if cell not in "#.":
-                graph[cell] = find_adjacent(grid, Position(x, y))
+    for pos, cell in enumerate(maze):
+        # Robots only ever start from an entrance, or from a key
+        if cell in "#." or cell.isupper():
+            continue
+        graph[cell] = find_keys(maze, width, pos)
 
     return graph
 
 
-def solve(G: Graph, start: str) -> int:
-    @lru_cache(2**20)
-    def reachable_keys(src: str, found: FrozenSet[str]) -> GraphInfo:
-        queue = []
-        distance: DefaultDict[str, Union[float, int]] = defaultdict(lambda: inf)
-        reachable: GraphInfo = []
-
-        for neighbor, weight in G[src]:
-            queue.append((weight, neighbor))  # Weight first for heap comparisons
+class SearchResult(NamedTuple):
+    steps: int
+    # Number of (robot positions, found keys) states kept by the search
+    peak_cache_size: int
 
-        heapq.heapify(queue)
 
-        while queue:
-            dist, node = heapq.heappop(queue)
+def search(G: Graph, start: str) -> SearchResult:
+    all_keys = 0
+    for node in G:
+        if node.islower():
+            all_keys |= key_mask(node)
 
-            # Do key, add it to reachable if not found previously
-            if node.islower() and node not in found:
-                reachable.append((node, dist))
-                continue
+    # Dijkstra over the position of each robot, and the keys found so far
+    State = Tuple[str, int]
+    distance: Dict[State, int] = {(start, 0): 0}
+    queue = [(0, start, 0)]
 
-            # Do door, if not opened by a key that was found in the search
-            if node.lower() not in found:
-                continue
+    while queue:
+        dist, sources, found = heapq.heappop(queue)
+        if found == all_keys:
+            return SearchResult(dist, len(distance))
+        if distance[sources, found] < dist:
+            continue
 
-            # If not a key and not a closed door
-            for neighbor, weight in G[node]:
+        for i, src in enumerate(sources):
+            for key, weight, required in G[src]:
+                mask = key_mask(key)
+                if found & mask:
+                    continue
+                if required & ~found:
+                    continue
+                new_state = (sources[:i] + key + sources[i + 1 :], found | mask)
                 new_dist = dist + weight
-                if new_dist < distance[neighbor]:
-                    distance[neighbor] = new_dist
-                    heapq.heappush(queue, (new_dist, neighbor))
+                if new_dist < distance.get(new_state, new_dist + 1):
+                    distance[new_state] = new_dist
+                    heapq.heappush(queue, (new_dist, *new_state))
 
-        return reachable
+    assert False  # Sanity check
 
-    @lru_cache(2**20)
-    def min_steps(
-        sources: str, keys_to_find: int, found: FrozenSet[str] = frozenset()
-    ) -> Union[float, int]:
-        if keys_to_find == 0:
-            return 0
 
-        best = inf
-
-        for src in sources:
-            for key, dist in reachable_keys(src, found):
-                new_keys = found | {key}
-                new_sources = sources.replace(src, key)
-                new_dist = dist + min_steps(new_sources, keys_to_find - 1, new_keys)
-
-                if new_dist < best:
-                    best = new_dist
-
-        return best
-
-    total_keys = sum(node.islower() for node in G)
-    return int(min_steps(start, total_keys))  # Throw if we kept the infinite float
+def solve(G: Graph, start: str) -> int:
+    return search(G, start).steps
 
 
 def main() -> None:
     G = build_graph(list(line.strip() for line in sys.stdin.readlines()))
-    print(solve(G, "1234"))
+    res = search(G, "1234")
+    print(f"Peak cache size: {res.peak_cache_size}", file=sys.stderr)
+    print(res.steps)
 
 
 if __name__ == "__main__":
@@ -1,33 +1,24 @@
 #!/usr/bin/env python
-import itertools
 import sys
-from collections import defaultdict
-from typing import Dict, Iterator, List
+from array import array
+from typing import List
 
 
-def nth(iterable: Iterator[int], n: int) -> int:
-    return next(itertools.islice(iterable, n, None))
-
-
-def spoken(spoken: List[int]) -> Iterator[int]:
-    turn = 0
-    turns: Dict[int, List[int]] = defaultdict(list)
-    for last in spoken:
-        turn += 1
-        turns[last].append(turn)
-        yield last
-    while True:
-        if len(last_turn := turns[last]) < 2:
-            last = 0
-        else:
-            last = last_turn[-1] - last_turn[-2]
-        turn += 1
-        turns[last].append(turn)
-        yield last
+def play(starting: List[int], turns: int) -> int:
+    # Turn at which each number was last spoken, 0 if it never was
+    last_seen = array("I", [0]) * max(turns, max(starting) + 1)
+    for turn, n in enumerate(starting[:-1], start=1):
+        last_seen[n] = turn
+    last = starting[-1]
+    for turn in range(len(starting), turns):
+        previous = last_seen[last]
+        last_seen[last] = turn
+        last = turn - previous if previous else 0
+    return last
 
 
 def solve(nums: List[int]) -> int:
-    return nth(spoken(nums), 30000000 - 1)
+    return play(nums, 30000000)
 
 
 def main() -> None:
@@ -1,20 +1,26 @@
 #!/usr/bin/env python
 
-import itertools
 import sys
+from array import array
 from typing import List
 
 
-def solve(circle: List[int]) -> int:
-    def to_links(circle: List[int]) -> List[int]:
-        links = [-1 for __ in range(len(circle) + 1)]
-        cyclic = itertools.cycle(circle)
-        next(cyclic)  # Advance it by one
-        for prev, cur in zip(circle, cyclic):
-            links[prev] = cur
-        return links
-
-    def step(links: List[int], current: int) -> int:
+def make_ring(circle: List[int], size: int) -> array:
+    # `links[cup]` is the cup following it, labels past the input come in order
+    links = array("I", range(1, size + 2))
+    for prev, cur in zip(circle, circle[1:]):
+        links[prev] = cur
+    if size > len(circle):
+        links[circle[-1]] = len(circle) + 1
+        links[size] = circle[0]
+    else:
+        links[circle[-1]] = circle[0]
+    return links
+
+
+def play(links: array, current: int, moves: int) -> None:
+    max_cup = len(links) - 1
+    for __ in range(moves):
         cup0 = links[current]
         cup1 = links[cup0]
         cup2 = links[cup1]
@@ -22,16 +28,19 @@ def solve(circle: List[int]) -> int:
         links[current] = links[cup2]  # Remove 3-tuple from the linked-list
 
         # Find destination
-        dest = (current - 1) if current > 1 else (len(links) - 1)
-        while dest in (cup0, cup1, cup2):
-            dest = (dest - 1) if dest > 1 else (len(links) - 1)
+        dest = current - 1 or max_cup
+        while dest == cup0 or dest == cup1 or dest == cup2:
+            dest = dest - 1 or max_cup
 
         # Update our links
-        links[cup2], links[dest] = links[dest], cup0
+        links[cup2] = links[dest]
+        links[dest] = cup0
 
-        return links[current]  # What's the next value in the cycle ?
+        current = links[current]  # What's the next value in the cycle ?
 
-    def to_answer(links: List[int]) -> int:
+
+def solve(circle: List[int]) -> int:
+    def to_answer(links: array) -> int:
         next = links[1]
         res = 0
         while next != 1:
@@ -39,11 +48,8 @@ def solve(circle: List[int]) -> int:
             next = links[next]
         return res
 
-    current = circle[0]
-    links = to_links(circle)
-
-    for __ in range(100):
-        current = step(links, current)
+    links = make_ring(circle, len(circle))
+    play(links, circle[0], 100)
 
     return to_answer(links)
 
@@ -2,171 +2,121 @@
 
 import itertools
 import sys
-from dataclasses import dataclass
-from typing import List, Optional, Set, Tuple
+from collections import Counter, deque
+from typing import Deque, List, Optional, Tuple
 
+import numpy as np
 
-@dataclass(eq=True, frozen=True)  # Hash-able
-class Vector:
-    x: int
-    y: int
-    z: int
 
-    def __add__(self, other: "Vector") -> "Vector":
-        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
-
-    def __sub__(self, other: "Vector") -> "Vector":
-        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
-
-
-@dataclass(eq=True, frozen=True)  # Hash-able
-class Matrix:
-    v1: Vector
-    v2: Vector
-    v3: Vector
-
-    def __matmul__(self, other: Vector) -> Vector:
-        return Vector(
-            self.v1.x * other.x + self.v1.y * other.y + self.v1.z * other.z,
-            self.v2.x * other.x + self.v2.y * other.y + self.v2.z * other.z,
-            self.v3.x * other.x + self.v3.y * other.y + self.v3.z * other.z,
-        )
-
-
-def rotations() -> List[Matrix]:
-    def cos(angle: int) -> int:
-        if angle == 0:
-            return 1
-        if angle == 180:
-            return -1
-        assert angle in (90, 270)  # Sanity check
-        return 0
-
-    def sin(angle: int) -> int:
-        if angle == 90:
-            return 1
-        if angle == 270:
-            return -1
-        assert angle in (0, 180)  # Sanity check
-        return 0
-
-    def rotate(x: int, y: int, z: int) -> Matrix:
-        v1 = Vector(
-            cos(z) * cos(y),
-            cos(z) * sin(y) * sin(x) - sin(z) * cos(x),
-            cos(z) * sin(y) * cos(x) + sin(z) * sin(x),
-        )
-        v2 = Vector(
-            sin(z) * cos(y),
-            sin(z) * sin(y) * sin(x) + cos(z) * cos(x),
-            sin(z) * sin(y) * cos(x) - cos(z) * sin(x),
-        )
-        v3 = Vector(-sin(y), cos(y) * sin(x), cos(y) * cos(x))
-        return Matrix(v1, v2, v3)
-
-    return [
-        rotate(0, 0, 0),
-        rotate(90, 0, 0),
-        rotate(180, 0, 0),
-        rotate(270, 0, 0),
-        rotate(0, 90, 0),
-        rotate(90, 90, 0),
-        rotate(180, 90, 0),
-        rotate(270, 90, 0),
-        rotate(0, 180, 0),
-        rotate(90, 180, 0),
-        rotate(180, 180, 0),
-        rotate(270, 180, 0),
-        rotate(0, 270, 0),
-        rotate(90, 270, 0),
-        rotate(180, 270, 0),
-        rotate(270, 270, 0),
-        rotate(0, 0, 90),
-        rotate(90, 0, 90),
-        rotate(180, 0, 90),
-        rotate(270, 0, 90),
-        rotate(0, 0, 270),
-        rotate(90, 0, 270),
-        rotate(180, 0, 270),
-        rotate(270, 0, 270),
-    ]
+def rotations() -> np.ndarray:
+    res = []
+    # Rotations are the signed permutation matrices which keep orientation
+    for permutation in itertools.permutations(range(3)):
+        for signs in itertools.product((1, -1), repeat=3):
+            matrix = np.zeros((3, 3), dtype=np.int64)
+            for row, (column, sign) in enumerate(zip(permutation, signs)):
+                matrix[row, column] = sign
+            if round(np.linalg.det(matrix)) == 1:
+                res.append(matrix)
+    assert len(res) == 24  # Sanity check
+    return np.array(res)
 
 
 ROTATIONS = rotations()
 
-BeaconList = Set[Vector]
+# An array of shape (n, 3), one beacon per row
+BeaconList = np.ndarray
+
+# Two overlapping scanners share at least this many beacons...
+OVERLAP = 12
+# ... And therefore at least this many distances between those beacons
+OVERLAP_DISTANCES = OVERLAP * (OVERLAP - 1) // 2
+
+
+def fingerprint(beacons: BeaconList) -> Counter[int]:
+    # Squared distances between beacons do not depend on rotation or position
+    deltas = beacons[:, np.newaxis, :] - beacons[np.newaxis, :, :]
+    distances = (deltas**2).sum(axis=-1)
+    # Distances can repeat, keep their multiplicity to not miss overlaps
+    return Counter(distances[np.triu_indices(len(beacons), k=1)].tolist())
+
+
+# Find the rotation and translation bringing `other` in the frame of `known`
+def find_overlap(
+    known: BeaconList, other: BeaconList
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    # All rotations of `other` at once, of shape (24, n, 3)
+    rotated = np.einsum("rij,nj->rni", ROTATIONS, other)
+    # Every delta between a known beacon and a rotated one, for each rotation
+    deltas = known[np.newaxis, np.newaxis, :, :] - rotated[:, :, np.newaxis, :]
+    deltas = deltas.reshape(len(ROTATIONS), -1, 3)
+
+    # Count the most common delta of each rotation, by packing them into ints
+    offset = 2 * int(np.abs(deltas).max()) + 1
+    keys = ((deltas[..., 0] * offset) + deltas[..., 1]) * offset + deltas[..., 2]
+    keys += np.arange(len(ROTATIONS))[:, np.newaxis] * offset**3
+    _, first, counts = np.unique(keys.ravel(), return_index=True, return_counts=True)
+    best = counts.argmax()
+    if counts[best] < OVERLAP:
+        return None
+
+    r, i = divmod(int(first[best]), deltas.shape[1])
+    return ROTATIONS[r], deltas[r, i]
 
 
 def solve(input: List[str]) -> int:
     def parse() -> List[BeaconList]:
-        res: List[BeaconList] = []
+        res: List[List[Tuple[int, ...]]] = []
 
         for line in input:
             if "scanner" in line:
-                res.append(set())
+                res.append([])
                 continue
             if line == "":
                 continue
-            x, y, z = map(int, line.split(","))
-            res[-1].add(Vector(x, y, z))
-
-        return res
-
-    def find_overlap(
-        known: BeaconList, other: BeaconList
-    ) -> Optional[Tuple[Matrix, Vector]]:
-        def find_delta(known: BeaconList, other: BeaconList) -> Optional[Vector]:
-            for dest, source in itertools.product(known, rotated):
-                delta = dest - source
-                if sum((v + delta) in known for v in rotated) >= 12:
-                    return delta
-            return None
-
-        for r in ROTATIONS:
-            rotated = set(r @ v for v in other)
-            if (delta := find_delta(known, rotated)) is not None:
-                return r, delta
-
-        return None
-
-    def apply(known: BeaconList, other: BeaconList) -> Tuple[bool, Vector, BeaconList]:
-        res = find_overlap(known, other)
-        if res is None:
-            return False, Vector(0, 0, 0), known
+            res[-1].append(tuple(map(int, line.split(","))))
 
-        rot, delta = res
+        return [np.array(beacons, dtype=np.int64) for beacons in res]
 
-        new = {(rot @ v) + delta for v in other}
-
-        # Return whether there are new points in the set
-        return (new <= known), delta, (known | new)
-
-    def match_all(scans: List[BeaconList]) -> Set[Vector]:
-        # First scan is our basis
-        known = scans[0]
-        # No need to inspect the first scan in the future
-        to_match = scans[1:]
+    # Returns every beacon and scanner position, relative to the first scanner
+    def match_all(scans: List[BeaconList]) -> Tuple[BeaconList, BeaconList]:
+        fingerprints = [fingerprint(beacons) for beacons in scans]
+        # Beacons once brought in the frame of the first scan, our basis
+        aligned: List[Optional[BeaconList]] = [scans[0]] + [None] * (len(scans) - 1)
         # Position our first scanner at the origin
-        deltas = {Vector(0, 0, 0)}
-
-        while to_match:
-            s = to_match.pop(0)
-            applied, delta, known = apply(known, s)
-            if not applied:
-                to_match.append(s)
-            else:
-                deltas.add(delta)
-        return deltas
-
-    def manhattan_dist(v1: Vector, v2: Vector) -> int:
-        return abs(v1.x - v2.x) + abs(v1.y - v2.y) + abs(v1.z - v2.z)
-
-    beacons = parse()
-    scanner_positions = match_all(beacons)
-    return max(
-        manhattan_dist(v1, v2)
-        for v1, v2 in itertools.combinations(scanner_positions, 2)
-    )
+        positions = np.zeros((len(scans), 3), dtype=np.int64)
+
+        # BFS over the graph of overlapping scanners
+        queue: Deque[int] = deque([0])
+        while queue:
+            i = queue.popleft()
+            known = aligned[i]
+            assert known is not None  # Sanity check
+            for j, other in enumerate(scans):
+                if aligned[j] is not None:
+                    continue
+                # Only try aligning scanners which could possibly overlap
+                common = fingerprints[i] & fingerprints[j]
+                if sum(common.values()) < OVERLAP_DISTANCES:
+                    continue
+                if (res := find_overlap(known, other)) is None:
+                    continue
+                rot, delta = res
+                aligned[j] = other @ rot.T + delta
+                positions[j] = delta
+                queue.append(j)
+
+        assert all(beacons is not None for beacons in aligned)  # Sanity check
+        beacons = np.unique(
+            np.concatenate([b for b in aligned if b is not None]), axis=0
+        )
+        return beacons, positions
+
+    scans = parse()
+    _, scanner_positions = match_all(scans)
+    # Manhattan distance between each pair of scanners
+    deltas = scanner_positions[:, np.newaxis, :] - scanner_positions[np.newaxis, :, :]
+    return int(np.abs(deltas).sum(axis=-1).max())
 
 
 def main() -> None:
@@ -1,20 +1,13 @@
 #!/usr/bin/env python
 
-import functools
-import itertools
 import sys
-from typing import List, NamedTuple, Optional, Set, Tuple
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple, cast
 
+import numpy as np
 
-class Point(NamedTuple):
-    x: int
-    y: int
-    z: int
-
-
-class Cuboid(NamedTuple):
-    min: Point
-    max: Point
+# Inclusive bounds: min_x, max_x, min_y, max_y, min_z, max_z
+Cuboid = Tuple[int, int, int, int, int, int]
 
 
 class Step(NamedTuple):
@@ -22,10 +15,80 @@ class Step(NamedTuple):
     bounds: Cuboid
 
 
-Grid = Set[Cuboid]
+# The lit cubes, as a signed sum of cuboids (i.e: inclusion-exclusion)
+class Reactor:
+    # Each row is a cuboid's bounds, rows with a sign of 0 are left-over holes
+    bounds: np.ndarray
+    signs: np.ndarray
+    size: int
+    rows: Dict[Cuboid, int]
+
+    def __init__(self) -> None:
+        self.bounds = np.empty((1024, 6), dtype=np.int64)
+        self.signs = np.zeros(1024, dtype=np.int64)
+        self.size = 0
+        self.rows = {}
+
+    def overlapping(self, area: Cuboid) -> np.ndarray:
+        bounds = self.bounds[: self.size]
+        mask = self.signs[: self.size] != 0
+        for axis in range(3):
+            mask &= bounds[:, 2 * axis] <= area[2 * axis + 1]
+            mask &= bounds[:, 2 * axis + 1] >= area[2 * axis]
+        return np.flatnonzero(mask)
+
+    def add(self, cuboid: Cuboid, sign: int) -> None:
+        if (row := self.rows.get(cuboid)) is None:
+            if self.size == len(self.signs):
+                self.compact()
+            row = self.rows[cuboid] = self.size
+            self.bounds[row] = cuboid
+            self.size += 1
+        self.signs[row] += sign
+
+    # Remove the holes, and make room for new rows if needed
+    def compact(self) -> None:
+        keep = np.flatnonzero(self.signs[: self.size])
+        capacity = max(1024, 2 * len(keep))
+        bounds = np.empty((capacity, 6), dtype=np.int64)
+        signs = np.zeros(capacity, dtype=np.int64)
+        bounds[: len(keep)] = self.bounds[keep]
+        signs[: len(keep)] = self.signs[keep]
+        self.bounds, self.signs, self.size = bounds, signs, len(keep)
+        self.rows = {
+            cast(Cuboid, tuple(cuboid)): row
+            for row, cuboid in enumerate(bounds[: self.size].tolist())
+        }
+
+    def apply(self, step: Step) -> None:
+        update: Counter[Cuboid] = Counter()
+
+        # Cancel out whatever was already counted inside the step's cuboid
+        hits = self.overlapping(step.bounds)
+        overlaps = self.bounds[hits]
+        overlaps[:, 0::2] = np.maximum(overlaps[:, 0::2], step.bounds[0::2])
+        overlaps[:, 1::2] = np.minimum(overlaps[:, 1::2], step.bounds[1::2])
+        for overlap, sign in zip(overlaps.tolist(), self.signs[hits].tolist()):
+            update[cast(Cuboid, tuple(overlap))] -= sign
+
+        # Add it back in if we want to turn on those cubes
+        if step.state:
+            update[step.bounds] += 1
+
+        for cuboid, sign in update.items():
+            if sign:
+                self.add(cuboid, sign)
 
-MAX_BOUND = 10000000000000000000000000000000000000000000  # Just a very large integer
-MIN_BOUND = -MAX_BOUND
+    def volume(self, area: Optional[Cuboid] = None) -> int:
+        rows = np.arange(self.size) if area is None else self.overlapping(area)
+        bounds = self.bounds[rows]
+        if area is not None:
+            bounds[:, 0::2] = np.maximum(bounds[:, 0::2], area[0::2])
+            bounds[:, 1::2] = np.minimum(bounds[:, 1::2], area[1::2])
+        sizes = (bounds[:, 1::2] + 1 - bounds[:, 0::2]).tolist()
+        signs = self.signs[rows].tolist()
+        # Sum as Python integers, which cannot overflow
+        return sum(sign * x * y * z for sign, (x, y, z) in zip(signs, sizes))
 
 
 def solve(input: List[str]) -> int:
@@ -44,124 +107,16 @@ def solve(input: List[str]) -> int:
             assert min_y <= max_y
             assert min_z <= max_z
 
-            bounds = Cuboid(Point(min_x, min_y, min_z), Point(max_x, max_y, max_z))
+            bounds = (min_x, max_x, min_y, max_y, min_z, max_z)
 
             return Step(state == "on", bounds)
 
         return [parse_step(line) for line in input]
 
-    def overlapping_range(
-        min_a: int, max_a: int, min_b: int, max_b: int
-    ) -> Optional[Tuple[int, int]]:
-        if max_a < min_b or min_a > max_b:
-            return None
-        return max(min_a, min_b), min(max_a, max_b)
-
-    def overlapping_cube(cube: Cuboid, other: Cuboid) -> Optional[Cuboid]:
-        xs = overlapping_range(cube.min.x, cube.max.x, other.min.x, other.max.x)
-        ys = overlapping_range(cube.min.y, cube.max.y, other.min.y, other.max.y)
-        zs = overlapping_range(cube.min.z, cube.max.z, other.min.z, other.max.z)
-
-        if xs is None or ys is None or zs is None:
-            return None
-        return Cuboid(Point(xs[0], ys[0], zs[0]), Point(xs[1], ys[1], zs[1]))
-
-    def overlaps(cube: Cuboid, other: Cuboid) -> bool:
-        return overlapping_cube(cube, other) is not None
-
-    def carve_out(grid: Grid, hole: Cuboid) -> Grid:
-        from itertools import filterfalse
-
-        def do_carve(c: Cuboid) -> Set[Cuboid]:
-            cubes: Set[Cuboid] = set()
-
-            min, max = c
-
-            rightside = overlapping_range(hole.max.x + 1, MAX_BOUND, min.x, max.x)
-            leftside = overlapping_range(MIN_BOUND, hole.min.x - 1, min.x, max.x)
-            xs = overlapping_range(hole.min.x, hole.max.x, min.x, max.x)
-            if rightside is not None:
-                min_r, max_r = rightside
-                cubes.add(
-                    Cuboid(Point(min_r, min.y, min.z), Point(max_r, max.y, max.z))
-                )
-            if leftside is not None:
-                min_l, max_l = leftside
-                cubes.add(
-                    Cuboid(Point(min_l, min.y, min.z), Point(max_l, max.y, max.z))
-                )
-
-            backside = overlapping_range(hole.max.y + 1, MAX_BOUND, min.y, max.y)
-            frontside = overlapping_range(MIN_BOUND, hole.min.y - 1, min.y, max.y)
-            ys = overlapping_range(hole.min.y, hole.max.y, min.y, max.y)
-            if backside is not None and xs is not None:
-                min_x, max_x = xs
-                min_b, max_b = backside
-                cubes.add(
-                    Cuboid(Point(min_x, min_b, min.z), Point(max_x, max_b, max.z))
-                )
-            if frontside is not None and xs is not None:
-                min_x, max_x = xs
-                min_f, max_f = frontside
-                cubes.add(
-                    Cuboid(Point(min_x, min_f, min.z), Point(max_x, max_f, max.z))
-                )
-
-            topside = overlapping_range(hole.max.z + 1, MAX_BOUND, min.z, max.z)
-            bottomside = overlapping_range(MIN_BOUND, hole.min.z - 1, min.z, max.z)
-            if topside is not None and xs is not None and ys is not None:
-                min_x, max_x = xs
-                min_y, max_y = ys
-                min_t, max_t = topside
-                cubes.add(
-                    Cuboid(Point(min_x, min_y, min_t), Point(max_x, max_y, max_t))
-                )
-            if bottomside is not None and xs is not None and ys is not None:
-                min_x, max_x = xs
-                min_y, max_y = ys
-                min_b, max_b = bottomside
-                cubes.add(
-                    Cuboid(Point(min_x, min_y, min_b), Point(max_x, max_y, max_b))
-                )
-
-            return cubes
-
-        overlaps_us = lambda c: overlaps(c, hole)
-
-        of_interest, other = filter(overlaps_us, grid), filterfalse(overlaps_us, grid)
-
-        return set(other) | set(
-            itertools.chain.from_iterable(do_carve(c) for c in of_interest)
-        )
-
-    def apply(grid: Grid, step: Step) -> Grid:
-        cuboid = step.bounds
-
-        # Remove that cube from the grid, potentially splitting cubes that overlap
-        grid = carve_out(grid, cuboid)
-
-        # Add it back in if we want to turn on those cubes
-        if step.state:
-            grid.add(cuboid)
-
-        return grid
-
-    def count_cubes(c: Cuboid) -> int:
-        min, max = c
-        return (max.x + 1 - min.x) * (max.y + 1 - min.y) * (max.z + 1 - min.z)
-
-    def score(grid: Grid) -> int:
-        area_of_interest = Cuboid(Point(-50, -50, -50), Point(50, 50, 50))
-        of_interest = {
-            cube
-            for cube in map(lambda c: overlapping_cube(c, area_of_interest), grid)
-            if cube is not None
-        }
-        return sum(map(count_cubes, of_interest))
-
-    steps = parse()
-    grid: Grid = functools.reduce(apply, steps, set())
-    return score(grid)
+    reactor = Reactor()
+    for step in parse():
+        reactor.apply(step)
+    return reactor.volume((-50, 50, -50, 50, -50, 50))
 
 
 def main() -> None:
@@ -1,14 +1,9 @@
 #!/usr/bin/env python
 
 import enum
-import functools
+import heapq
 import sys
-from typing import Iterator, List, NamedTuple, Optional, Tuple
-
-
-class Point(NamedTuple):
-    x: int
-    y: int
+from typing import Iterator, List, Tuple
 
 
 class Amphipod(enum.IntEnum):
@@ -18,38 +13,20 @@ class Amphipod(enum.IntEnum):
     D = 3
 
 
-class Direction(enum.IntEnum):
-    ALLEY = 0
-    ROOM = 1
-
-
-# 7-length tuple, but easier for mypy in a variadic type
-Alley = Tuple[Optional[Amphipod], ...]
-
-# Actually variadic tuple, instead of a list, for memoization purposes
-Room = Tuple[Amphipod, ...]
-
-# 4-length tuple, but easier for mypy in a variadic type
-Rooms = Tuple[Room, ...]
-
-
-class Board(NamedTuple):
-    alley: Alley
-    rooms: Rooms
+# The board is packed into an int, with 3 bits per cell: 0 when empty, or the
+# amphipod plus one. The 7 alley spots come first, then each room from top to bottom
+Board = int
 
+# Number of spots in the alley, amphipods cannot stop in front of rooms
+ALLEY_SIZE = 7
 
-class Move(NamedTuple):
-    cost: int
-    new_board: Board
+CELL_BITS = 3
+CELL_MASK = (1 << CELL_BITS) - 1
 
+# Indexed by `Amphipod`
+FUEL_COST = [1, 10, 100, 1000]
 
-FUEL_COST = {
-    Amphipod.A: 1,
-    Amphipod.B: 10,
-    Amphipod.C: 100,
-    Amphipod.D: 1000,
-}
-
+# Distance from the top cell of each room to each alley spot, minus one
 DISTANCE = [
     # From room 1
     (2, 1, 1, 3, 5, 7, 8),
@@ -68,127 +45,154 @@ AMPHIPOD_FROM_STRING = {
     "D": Amphipod.D,
 }
 
-ROOM_SIZE = 2
 
+def cell_mask(i: int) -> int:
+    return CELL_MASK << (i * CELL_BITS)
 
-def solve(input: List[str]) -> int:
-    def parse() -> Board:
-        alley: Alley = (None,) * 7
-        rooms: Rooms = ()
-        for i in (3, 5, 7, 9):
-            room: Room = tuple(
-                AMPHIPOD_FROM_STRING[input[j][i]] for j in range(2, 3 + 1)
-            )
-            rooms = rooms + (room,)
-
-        return Board(alley, rooms)
-
-    def room_is_solved(board: Board, amphipod: Amphipod) -> bool:
-        room = board.rooms[amphipod]
-        return len(room) == ROOM_SIZE and all(a == amphipod for a in room)
-
-    def board_is_solved(board: Board) -> bool:
-        return all(room_is_solved(board, Amphipod(i)) for i in range(len(board.rooms)))
-
-    def move_cost(
-        board: Board, room: int, alley_spot: int, direction: Direction
-    ) -> Optional[int]:
-        # Going left-to-right, or right-to-left
-        if room < (alley_spot - 1):
-            alley_start = room + 2
-            # Look at the end spot if we're going to the alley, not if we come from there
-            alley_end = alley_spot + (1 - direction)
-        else:
-            # Look at the first spot if we're going to the alley, not if we come from there
-            alley_start = alley_spot + direction
-            alley_end = room + 2
-
-        # Is there any obstacle in the way
-        if any(spot is not None for spot in board.alley[alley_start:alley_end]):
-            return None
-
-        amphipod = (
-            board.alley[alley_spot]
-            if direction == Direction.ROOM
-            else board.rooms[room][0]
-        )
-        assert amphipod is not None  # Sanity check
 
-        return FUEL_COST[amphipod] * (
-            DISTANCE[room][alley_spot] + direction + ROOM_SIZE - len(board.rooms[room])
+# Mask of the alley spots strictly between each room and each alley spot
+PATH_MASK = [
+    [
+        sum(
+            cell_mask(spot)
+            for spot in (
+                range(alley_spot + 1, room + 2)
+                if alley_spot < room + 2
+                else range(room + 2, alley_spot)
+            )
         )
+        for alley_spot in range(ALLEY_SIZE)
+    ]
+    for room in range(len(Amphipod))
+]
 
-    # Yes this returns a 0-or-1 length iterator, but it's practical for `moves`
-    def alley_moves_for(board: Board, i: int) -> Iterator[Move]:
-        # Return early if we're trying to move out of an empty spot
-        spot = board.alley[i]
-        if spot is None:
-            return
-
-        # Can't yet move to the target room if any amphipod is out of place there
-        if any(other != spot for other in board.rooms[spot]):
-            return
 
-        cost = move_cost(board, spot, i, Direction.ROOM)
+def min_cost(rooms: List[List[Amphipod]]) -> int:
+    room_size = len(rooms[0])
+    assert all(len(room) == room_size for room in rooms)  # Sanity check
 
-        # Can't move there yet, there's an obstacle in the way
-        if cost is None:
-            return
+    def room_cell(room: int, depth: int) -> int:
+        return ALLEY_SIZE + room * room_size + depth
 
-        # Update the board state
-        alley, rooms = board
-        rooms = rooms[:spot] + ((spot,) + rooms[spot],) + rooms[spot + 1 :]
-        alley = alley[:i] + (None,) + alley[i + 1 :]
+    def get(board: Board, i: int) -> int:
+        return (board >> (i * CELL_BITS)) & CELL_MASK
 
-        yield Move(cost, Board(alley, rooms))
+    def pack(rooms: List[List[Amphipod]]) -> Board:
+        board = 0
+        for room, amphipods in enumerate(rooms):
+            for depth, amphipod in enumerate(amphipods):
+                board |= (amphipod + 1) << (room_cell(room, depth) * CELL_BITS)
+        return board
 
-    def rooms_moves_for(board: Board, i: int) -> Iterator[Move]:
-        room = board.rooms[i]
-        # No need to move out of a solved room
-        if all(a == i for a in room):
-            return
+    room_shifts = [room_cell(room, 0) * CELL_BITS for room in range(len(Amphipod))]
+    depth_shifts = [depth * CELL_BITS for depth in range(room_size)]
 
-        for dest in range(len(board.alley)):
-            cost = move_cost(board, i, dest, Direction.ALLEY)
+    def room_contents(board: Board, room: int) -> List[int]:
+        room_bits = board >> room_shifts[room]
+        return [(room_bits >> shift) & CELL_MASK for shift in depth_shifts]
 
+    def moves(board: Board) -> Iterator[Tuple[int, Board]]:
+        # Moving an amphipod to its room is always optimal, do it first
+        for alley_spot in range(ALLEY_SIZE):
+            if (cell := get(board, alley_spot)) == 0:
+                continue
+            room = cell - 1
             # Can't move there yet, there's an obstacle in the way
-            if cost is None:
+            if board & PATH_MASK[room][alley_spot]:
                 continue
+            contents = room_contents(board, room)
+            # Can't yet move to the target room if any amphipod is out of place there
+            if any(other not in (0, cell) for other in contents):
+                continue
+            depth = contents.count(0) - 1
+            cost = FUEL_COST[room] * (DISTANCE[room][alley_spot] + depth + 1)
+            board ^= cell << (alley_spot * CELL_BITS)
+            board |= cell << (room_cell(room, depth) * CELL_BITS)
+            yield cost, board
+            return
 
-            # Update the board state
-            alley, rooms = board
-            rooms = rooms[:i] + (room[1:],) + rooms[i + 1 :]
-            alley = alley[:dest] + (room[0],) + alley[dest + 1 :]
-
-            yield Move(cost, Board(alley, rooms))
-
-    def moves(board: Board) -> Iterator[Move]:
-        for i in range(len(board.alley)):
-            yield from alley_moves_for(board, i)
-        for i in range(len(board.rooms)):
-            yield from rooms_moves_for(board, i)
-
-    @functools.cache
-    def total_cost(board: Board) -> Optional[int]:
-        if board_is_solved(board):
-            return 0
+        for room in range(len(Amphipod)):
+            contents = room_contents(board, room)
+            depth = contents.count(0)
+            # No need to move out of an empty or solved room
+            if all(other == room + 1 for other in contents[depth:]):
+                continue
+            cell = contents[depth]
+            for alley_spot in range(ALLEY_SIZE):
+                # Can't move there yet, there's an obstacle in the way
+                if board & (PATH_MASK[room][alley_spot] | cell_mask(alley_spot)):
+                    continue
+                cost = FUEL_COST[cell - 1] * (DISTANCE[room][alley_spot] + depth + 1)
+                new_board = board ^ (cell << (room_cell(room, depth) * CELL_BITS))
+                new_board |= cell << (alley_spot * CELL_BITS)
+                yield cost, new_board
+
+    def heuristic(board: Board) -> int:
+        # Minimum energy to bring every amphipod home, ignoring obstacles
+        total = 0
+        # Amphipods which need to get into each room
+        entering = [0] * len(Amphipod)
+        for alley_spot in range(ALLEY_SIZE):
+            if (cell := get(board, alley_spot)) == 0:
+                continue
+            room = cell - 1
+            total += FUEL_COST[room] * (DISTANCE[room][alley_spot] + 1)
+            entering[room] += 1
+        for room in range(len(Amphipod)):
+            contents = room_contents(board, room)
+            # Amphipods sitting above any misplaced one have to move out
+            settled = room_size
+            while settled > 0 and contents[settled - 1] == room + 1:
+                settled -= 1
+            for depth, cell in enumerate(contents[:settled]):
+                if cell == 0:
+                    continue
+                home = cell - 1
+                # Leaving the room, going to the other one, entering it
+                distance = max(2 * abs(room - home), 2)
+                total += FUEL_COST[home] * (depth + 1 + distance + 1)
+                entering[home] += 1
+        # Entering amphipods fill the room from the bottom up
+        for room, count in enumerate(entering):
+            total += FUEL_COST[room] * count * (count - 1) // 2
+        return total
+
+    def a_star(start: Board, end: Board) -> int:
+        # Priority queue of (estimated total, cost, board)
+        queue = [(heuristic(start), 0, start)]
+        costs = {start: 0}
+
+        while len(queue) > 0:
+            _, cost, board = heapq.heappop(queue)
+            if board == end:
+                return cost
+            # We must have found a cheaper way to this board since it was queued
+            if cost > costs[board]:
+                continue
+            for move_cost, new_board in moves(board):
+                new_cost = cost + move_cost
+                if new_cost >= costs.get(new_board, new_cost + 1):
+                    continue
+                costs[new_board] = new_cost
+                heapq.heappush(
+                    queue, (new_cost + heuristic(new_board), new_cost, new_board)
+                )
 
-        best = None
+        assert False  # Sanity check
 
-        for cost, new_board in moves(board):
-            if (end_cost := total_cost(new_board)) is None:
-                continue
-            cost += end_cost
-            if best is None or cost < best:
-                best = cost
+    start = pack(rooms)
+    end = pack([[Amphipod(room)] * room_size for room in range(len(Amphipod))])
+    return a_star(start, end)
 
-        return best
 
-    board = parse()
-    cost = total_cost(board)
-    assert cost is not None  # Sanity check
+def solve(input: List[str]) -> int:
+    def parse() -> List[List[Amphipod]]:
+        return [
+            [AMPHIPOD_FROM_STRING[input[j][i]] for j in range(2, 3 + 1)]
+            for i in (3, 5, 7, 9)
+        ]
 
-    return cost
+    return min_cost(parse())
 
 
 def main() -> None:
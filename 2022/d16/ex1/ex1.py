@@ -1,9 +1,7 @@
 #!/usr/bin/env python
 
 import dataclasses
-import functools
 import sys
-from collections import defaultdict
 
 
 @dataclasses.dataclass
@@ -13,7 +11,7 @@ class Valve:
 
 
 Graph = dict[str, Valve]
-DistanceMatrix = dict[str, dict[str, int]]
+DistanceMatrix = list[list[int]]
 
 START_ROOM = "AA"
 
@@ -33,87 +31,71 @@ def solve(input: list[str]) -> int:
 
         return res
 
-    def useful_valves(g: Graph) -> set[str]:
-        return {k for k, v in g.items() if v.flow > 0}
+    def useful_valves(g: Graph) -> list[str]:
+        return sorted(k for k, v in g.items() if v.flow > 0)
 
+    # Distances between rooms, indexed in the order of `g`
     def floyd_warshall(g: Graph) -> DistanceMatrix:
-        points = list(g.keys())
-
-        res: DistanceMatrix = defaultdict(dict)
-
-        for p in points:
-            for n in g[p].neighbours:
-                res[p][n] = 1
-
-        for p in points:
-            for i in points:
-                for j in points:
-                    if (ip := res[i].get(p)) is None:
-                        continue
-                    if (pj := res[p].get(j)) is None:
-                        continue
-                    dist = ip + pj
-                    if (ij := res[i].get(j)) is not None:
-                        dist = min(dist, ij)
-                    res[i][j] = dist
+        index = {p: i for i, p in enumerate(g)}
+        unreachable = len(g)  # Longer than any path
+
+        res = [[unreachable] * len(g) for _ in g]
+        for p, valve in g.items():
+            res[index[p]][index[p]] = 0
+            for n in valve.neighbours:
+                res[index[p]][index[n]] = 1
+
+        for k, k_row in enumerate(res):
+            for i_row in res:
+                ik = i_row[k]
+                if ik == unreachable:
+                    continue
+                for j, kj in enumerate(k_row):
+                    i_row[j] = min(i_row[j], ik + kj)
 
         return res
 
-    def prune_distances(dist: DistanceMatrix, of_interest: set[str]) -> DistanceMatrix:
-        # Only keep non-zero valves for our visits
-        pruned = {
-            i: {j: dist for j, dist in line.items() if j in of_interest}
-            for i, line in dist.items()
-            if i in of_interest
-        }
-        # Explicitly add the starting room, in case it was pruned
-        pruned[START_ROOM] = {
-            n: dist for n, dist in dist[START_ROOM].items() if n in of_interest
-        }
-        return pruned
-
-    def max_flow(g: Graph, dist: DistanceMatrix) -> int:
-        def pressure_per_minute(opened_valves: frozenset[str]) -> int:
-            return sum(g[valve].flow for valve in opened_valves)
-
-        @functools.cache
-        def helper(start: str, time: int, opened_valves: frozenset[str]) -> int:
-            assert time >= 0  # Sanity check
-            if time == 0:
-                return 0
-
-            pressure = pressure_per_minute(opened_valves)
-
-            # Base-case, don't do anything
-            best = pressure * time
-
-            # Try to open the current valve if not done already
-            if start not in opened_valves:
-                best = max(
-                    best,
-                    helper(start, time - 1, opened_valves | {start}) + pressure,
-                )
-
-            # Try to go to each neighbour
-            for n, d in dist[start].items():
-                if d >= time:
+    # Only keep the rooms of interest for our visits, re-indexed in order
+    def prune_distances(
+        g: Graph, dist: DistanceMatrix, of_interest: list[str]
+    ) -> DistanceMatrix:
+        index = {p: i for i, p in enumerate(g)}
+        indices = [index[p] for p in of_interest]
+        return [[dist[i][j] for j in indices] for i in indices]
+
+    # Best pressure released when opening exactly the valves of each bitmask
+    def max_flow_per_subset(
+        flows: list[int], dist: DistanceMatrix, start: int, run_time: int
+    ) -> list[int]:
+        res = [0] * (1 << len(flows))
+
+        def dfs(pos: int, time: int, opened: int, pressure: int) -> None:
+            res[opened] = max(res[opened], pressure)
+            for valve, flow in enumerate(flows):
+                if opened & (1 << valve):
                     continue
-                best = max(
-                    best,
-                    helper(n, time - d, opened_valves) + pressure * d,
+                # Time left once travelled to, and opened, the valve
+                remaining = time - dist[pos][valve] - 1
+                if remaining <= 0:
+                    continue
+                dfs(
+                    valve, remaining, opened | (1 << valve), pressure + flow * remaining
                 )
 
-            return best
+        dfs(start, run_time, 0, 0)
+        return res
+
+    def max_flow(g: Graph) -> int:
+        valves = useful_valves(g)
+        # Explicitly add the starting room last, so valve bits match their index
+        rooms = valves + ([] if START_ROOM in valves else [START_ROOM])
+        dist = prune_distances(g, floyd_warshall(g), rooms)
 
-        opened_valves = set()
-        # If starting room has no flow, consider it open to reduce search space
-        if g[START_ROOM].flow == 0:
-            opened_valves.add(START_ROOM)
-        return helper(START_ROOM, 30, frozenset(opened_valves))
+        flows = [g[valve].flow for valve in valves]
+        return max(max_flow_per_subset(flows, dist, rooms.index(START_ROOM), 30))
 
     graph = to_graph(input)
-    dist = prune_distances(floyd_warshall(graph), useful_valves(graph))
-    return max_flow(graph, dist)
+    return max_flow(graph)
 
 
 def main() -> None:
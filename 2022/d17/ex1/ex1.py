@@ -4,26 +4,9 @@ import enum
 import itertools
 import sys
 from collections.abc import Iterator
-from typing import NamedTuple
 
-
-class Point(NamedTuple):
-    x: int
-    y: int
-
-    def __add__(self, other):
-        if not isinstance(other, Point):
-            return NotImplemented
-        return Point(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other):
-        if not isinstance(other, Point):
-            return NotImplemented
-        return Point(self.x - other.x, self.y - other.y)
-
-
-def translate(points: set[Point], delta: Point) -> set[Point]:
-    return {p + delta for p in points}
+# Each row of the chamber is stored as a bitmask, bit `x` being column `x`
+WIDTH = 7
 
 
 class Rock(str, enum.Enum):
@@ -37,16 +20,12 @@ class Rock(str, enum.Enum):
     def stream(cls) -> Iterator["Rock"]:
         yield from itertools.cycle(iter(cls))
 
-    def to_points(self) -> set[Point]:
-        res: set[Point] = set()
-
-        for y, line in enumerate(reversed(self.splitlines())):
-            for x, c in enumerate(line):
-                if c == ".":
-                    continue
-                res.add(Point(x, y))
-
-        return res
+    # Rows from the bottom up, aligned 2 units away from the left wall
+    def to_rows(self) -> tuple[int, ...]:
+        return tuple(
+            sum(1 << (x + 2) for x, c in enumerate(line) if c == "#")
+            for line in reversed(self.splitlines())
+        )
 
 
 class JetStream(str, enum.Enum):
@@ -57,11 +36,15 @@ class JetStream(str, enum.Enum):
     def stream(cls, jet_pattern: str) -> Iterator["JetStream"]:
         yield from itertools.cycle(map(cls, jet_pattern))
 
-    def as_delta(self) -> Point:
+    def push(self, rock: tuple[int, ...]) -> tuple[int, ...]:
         if self == self.LEFT:
-            return Point(-1, 0)
+            if any(row & 1 for row in rock):
+                return rock
+            return tuple(row >> 1 for row in rock)
         if self == self.RIGHT:
-            return Point(1, 0)
+            if any(row & (1 << (WIDTH - 1)) for row in rock):
+                return rock
+            return tuple(row << 1 for row in rock)
         assert False  # Sanity check
 
 
@@ -71,51 +54,37 @@ def solve(input: list[str]) -> int:
     rocks = Rock.stream()
     jet_stream = JetStream.stream(input[0])
 
-    fallen_stack: set[Point] = set()
-    max_height = 0
+    chamber: list[int] = []
 
-    LEFT_WALL = -1
-    RIGHT_WALL = 7
-    FLOOR = 0
-
-    def step(rock: set[Point]) -> tuple[set[Point], bool]:
-        jet = next(jet_stream)
-
-        # Check if it can be pushed by the jet, or if it hits an obstacle
-        pushed_rock = translate(rock, jet.as_delta())
-        if not (fallen_stack & pushed_rock) and all(
-            LEFT_WALL < p.x < RIGHT_WALL for p in pushed_rock
-        ):
-            rock = pushed_rock
-
-        # Check if it can go down
-        fallen_rock = translate(rock, Point(0, -1))
-
-        if not (fallen_stack & fallen_rock) and all(p.y > FLOOR for p in fallen_rock):
-            return fallen_rock, True
-        return rock, False
+    def collides(rock: tuple[int, ...], y: int) -> bool:
+        if y < 0:
+            return True
+        return any(
+            chamber[i] & row for i, row in enumerate(rock, start=y) if i < len(chamber)
+        )
 
     def simulate_rock_fall() -> None:
-        nonlocal max_height
-
-        rock = next(rocks).to_points()
-
-        # Align 2 units away from LEFT_WALL and 3 higher than
-        # current stack
-        rock = translate(rock, Point(2, max_height + 3 + 1))
+        rock = next(rocks).to_rows()
+        # Start 3 units higher than the current stack
+        y = len(chamber) + 3
 
         while True:
-            rock, keep_going = step(rock)
-            if not keep_going:
+            pushed_rock = next(jet_stream).push(rock)
+            if not collides(pushed_rock, y):
+                rock = pushed_rock
+            if collides(rock, y - 1):
                 break
+            y -= 1
 
-        fallen_stack.update(rock)
-        max_height = max(max_height, max(p.y for p in rock))
+        for i, row in enumerate(rock, start=y):
+            if i == len(chamber):
+                chamber.append(0)
+            chamber[i] |= row
 
     for _ in range(2022):
         simulate_rock_fall()
 
-    return max_height
+    return len(chamber)
 
 
 def main() -> None:
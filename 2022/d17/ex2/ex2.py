@@ -4,26 +4,12 @@ import enum
 import itertools
 import sys
 from collections.abc import Iterator
-from typing import NamedTuple
 
-
-class Point(NamedTuple):
-    x: int
-    y: int
-
-    def __add__(self, other):
-        if not isinstance(other, Point):
-            return NotImplemented
-        return Point(self.x + other.x, self.y + other.y)
-
-    def __sub__(self, other):
-        if not isinstance(other, Point):
-            return NotImplemented
-        return Point(self.x - other.x, self.y - other.y)
-
-
-def translate(points: set[Point], delta: Point) -> set[Point]:
-    return {p + delta for p in points}
+# Each row of the chamber is stored as a bitmask, bit `x` being column `x`
+WIDTH = 7
+# How many rows at the top of the stack are used to detect cycles, chosen
+# arbitrarily...
+TOP_ROWS = 50
 
 
 class Rock(str, enum.Enum):
@@ -37,16 +23,12 @@ class Rock(str, enum.Enum):
     def stream(cls) -> Iterator["Rock"]:
         yield from itertools.cycle(iter(cls))
 
-    def to_points(self) -> set[Point]:
-        res: set[Point] = set()
-
-        for y, line in enumerate(reversed(self.splitlines())):
-            for x, c in enumerate(line):
-                if c == ".":
-                    continue
-                res.add(Point(x, y))
-
-        return res
+    # Rows from the bottom up, aligned 2 units away from the left wall
+    def to_rows(self) -> tuple[int, ...]:
+        return tuple(
+            sum(1 << (x + 2) for x, c in enumerate(line) if c == "#")
+            for line in reversed(self.splitlines())
+        )
 
 
 class JetStream(str, enum.Enum):
@@ -57,73 +39,63 @@ class JetStream(str, enum.Enum):
     def stream(cls, jet_pattern: str) -> Iterator["JetStream"]:
         yield from itertools.cycle(map(cls, jet_pattern))
 
-    def as_delta(self) -> Point:
+    def push(self, rock: tuple[int, ...]) -> tuple[int, ...]:
         if self == self.LEFT:
-            return Point(-1, 0)
+            if any(row & 1 for row in rock):
+                return rock
+            return tuple(row >> 1 for row in rock)
         if self == self.RIGHT:
-            return Point(1, 0)
+            if any(row & (1 << (WIDTH - 1)) for row in rock):
+                return rock
+            return tuple(row << 1 for row in rock)
         assert False  # Sanity check
 
 
 def solve(input: list[str]) -> int:
-    fallen_stack: set[Point] = set()
-    max_height = 0
-
-    LEFT_WALL = -1
-    RIGHT_WALL = 7
-    FLOOR = 0
+    chamber: list[int] = []
 
-    rocks = list(iter(Rock))
+    rocks = [rock.to_rows() for rock in Rock]
     jet_stream = [JetStream(c) for c in input[0]]
 
     t = 0
     jet_index = 0
     rock_index = 0
 
-    def step(rock: set[Point], jet: JetStream) -> tuple[set[Point], bool]:
-        # Check if it can be pushed by the jet, or if it hits an obstacle
-        pushed_rock = translate(rock, jet.as_delta())
-        if not (fallen_stack & pushed_rock) and all(
-            LEFT_WALL < p.x < RIGHT_WALL for p in pushed_rock
-        ):
-            rock = pushed_rock
-
-        # Check if it can go down
-        fallen_rock = translate(rock, Point(0, -1))
-
-        if not (fallen_stack & fallen_rock) and all(p.y > FLOOR for p in fallen_rock):
-            return fallen_rock, True
-        return rock, False
+    def collides(rock: tuple[int, ...], y: int) -> bool:
+        if y < 0:
+            return True
+        return any(
+            chamber[i] & row for i, row in enumerate(rock, start=y) if i < len(chamber)
+        )
 
     def simulate_rock_fall() -> None:
-        nonlocal max_height
         nonlocal jet_index
         nonlocal rock_index
 
-        rock = rocks[rock_index].to_points()
-
-        # Align 2 units away from LEFT_WALL and 3 higher than
-        # current stack
-        rock = translate(rock, Point(2, max_height + 3 + 1))
+        rock = rocks[rock_index]
+        # Start 3 units higher than the current stack
+        y = len(chamber) + 3
 
         while True:
-            rock, keep_going = step(rock, jet_stream[jet_index])
+            pushed_rock = jet_stream[jet_index].push(rock)
             jet_index = (jet_index + 1) % len(jet_stream)
-            if not keep_going:
+            if not collides(pushed_rock, y):
+                rock = pushed_rock
+            if collides(rock, y - 1):
                 break
+            y -= 1
 
-        fallen_stack.update(rock)
-        max_height = max(max_height, max(p.y for p in rock))
+        for i, row in enumerate(rock, start=y):
+            if i == len(chamber):
+                chamber.append(0)
+            chamber[i] |= row
         rock_index = (rock_index + 1) % len(rocks)
 
-    StackStateHash = tuple[int, int, frozenset[Point]]
+    StackStateHash = tuple[int, int, int]
 
     def stack_state_hash() -> StackStateHash:
-        top = frozenset(
-            Point(p.x, p.y - max_height)
-            for p in fallen_stack
-            if p.y >= (max_height - 50)  # Cut-off point chosen arbitrarily...
-        )
+        # Rows fit in a byte, pack the top of the stack into a single integer
+        top = int.from_bytes(bytes(chamber[-TOP_ROWS:]))
         return rock_index, jet_index, top
 
     assert len(input) == 1  # Sanity check
@@ -140,12 +112,12 @@ def solve(input: list[str]) -> int:
             previous_t, previous_height = cache[stack_hash]
             cycle_length = t - previous_t
             num_cycles = (END_OF_SIMULATION - t) // cycle_length
-            added_height += num_cycles * (max_height - previous_height)
+            added_height += num_cycles * (len(chamber) - previous_height)
             t += num_cycles * cycle_length
         else:
-            cache[stack_hash] = t, max_height
+            cache[stack_hash] = t, len(chamber)
 
-    return max_height + added_height
+    return len(chamber) + added_height
 
 
 def main() -> None:
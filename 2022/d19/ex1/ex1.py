@@ -1,12 +1,12 @@
 #!/usr/bin/env python
 
+import concurrent.futures
 import dataclasses
 import enum
 import itertools
 import sys
-from collections import deque
-from collections.abc import Iterable, Iterator, Mapping
-from typing import NamedTuple, Optional, TypeVar
+from collections.abc import Iterable, Iterator
+from typing import TypeVar
 
 T = TypeVar("T")
 
@@ -24,45 +24,8 @@ class Resource(str, enum.Enum):
     ORE = "ore"
 
 
-class ResourceCost(Mapping[Resource, int]):
-    _dict: dict[Resource, int]
-    _hash: Optional[int]
-
-    def __init__(self, init: Mapping[Resource, int] = {}, /) -> None:
-        self._dict = {res: init.get(res, 0) for res in Resource}
-        self._hash = None
-
-        assert all(self._dict[res] >= 0 for res in Resource)  # Sanity check
-
-    def __getitem__(self, key: Resource, /) -> int:
-        return self._dict[key]
-
-    def __iter__(self) -> Iterator[Resource]:
-        return iter(Resource)  # Always use same Resource iteration order
-
-    def __len__(self) -> int:
-        return len(self._dict)
-
-    def __hash__(self) -> int:
-        if self._hash is None:
-            self._hash = hash(tuple(sorted(self._dict)))
-        return self._hash
-
-    def __add__(self, other):
-        if not isinstance(other, ResourceCost):
-            return NotImplemented
-        return ResourceCost({res: self[res] + other[res] for res in Resource})
-
-    def __sub__(self, other):
-        if not isinstance(other, ResourceCost):
-            return NotImplemented
-        return ResourceCost({res: self[res] - other[res] for res in Resource})
-
-    def __repr__(self) -> str:
-        return repr(self._dict)
-
-    def has_enough(self, costs: "ResourceCost") -> bool:
-        return all(self[res] >= costs[res] for res in Resource)
+# Costs in ore, clay, and obsidian
+ResourceCost = tuple[int, int, int]
 
 
 @dataclasses.dataclass
@@ -77,92 +40,139 @@ class Blueprint:
         costs: dict[Resource, ResourceCost] = {}
         for raw in map(str.split, raw_costs):
             ressource = Resource(raw[1])
-            costs[ressource] = ResourceCost(
-                {
-                    Resource(r.removesuffix(".")): int(c)
-                    for c, r in grouper((w for w in raw[4:] if w != "and"), 2)
-                }
+            cost = {
+                Resource(r.removesuffix(".")): int(c)
+                for c, r in grouper((w for w in raw[4:] if w != "and"), 2)
+            }
+            assert Resource.GEODE not in cost  # Sanity check
+            costs[ressource] = (
+                cost.get(Resource.ORE, 0),
+                cost.get(Resource.CLAY, 0),
+                cost.get(Resource.OBSIDIAN, 0),
             )
 
         return cls(costs)
 
     def maximize_geodes(self, run_time: int) -> int:
-        class QueueNode(NamedTuple):
-            time: int
-            robots: ResourceCost
-            inventory: ResourceCost
-            total_mined: ResourceCost
-
-        def prune_queue(queue: Iterable[QueueNode]) -> deque[QueueNode]:
-            def priority_key(node: QueueNode) -> int:
-                MULTIPLIERS = {
-                    Resource.GEODE: 1_000_000,
-                    Resource.OBSIDIAN: 10_000,
-                    Resource.CLAY: 100,
-                    Resource.ORE: 1,
-                }
-                return sum(
-                    node.total_mined[res] * mul for res, mul in MULTIPLIERS.items()
-                )
-
-            MAX_QUEUE = 1000  # Chosen arbitrarily
-            return deque(sorted(queue, key=priority_key, reverse=True)[:MAX_QUEUE])
-
-        def do_build(node: QueueNode, robot_type: Optional[Resource]) -> QueueNode:
-            costs = (
-                self.construction_costs[robot_type]
-                if robot_type is not None
-                else ResourceCost()
-            )
-            assert node.inventory.has_enough(costs)  # Sanity check
-            new_robots = node.robots + (
-                ResourceCost({robot_type: 1})
-                if robot_type is not None
-                else ResourceCost()
-            )
-            new_inventory = node.inventory + node.robots - costs
-            new_total_mined = node.total_mined + node.robots
-            return QueueNode(node.time + 1, new_robots, new_inventory, new_total_mined)
+        ore_ore = self.construction_costs[Resource.ORE][0]
+        clay_ore = self.construction_costs[Resource.CLAY][0]
+        obsidian_ore, obsidian_clay, _ = self.construction_costs[Resource.OBSIDIAN]
+        geode_ore, _, geode_obsidian = self.construction_costs[Resource.GEODE]
+
+        # No point in producing more of a resource than can be spent in a minute
+        max_ore_robots = max(ore_ore, clay_ore, obsidian_ore, geode_ore)
+        max_clay_robots = obsidian_clay
+        max_obsidian_robots = geode_obsidian
+
+        # How long until a robot can be built, including building time
+        def wait(cost: int, stock: int, robots: int) -> int:
+            if stock >= cost:
+                return 1
+            return -((stock - cost) // robots) + 1
+
+        # Optimistic bound: an obsidian robot is built for free every minute, and
+        # a geode robot whenever there is enough obsidian for it
+        def upper_bound(time: int, obsidian: int, obsidian_robots: int) -> int:
+            res = 0
+            for remaining in reversed(range(time)):
+                if obsidian >= geode_obsidian:
+                    obsidian -= geode_obsidian
+                    res += remaining
+                obsidian += obsidian_robots
+                obsidian_robots += 1
+            return res
 
         max_geode = 0
-
-        queue: deque[QueueNode] = deque(
-            # Starting conditions
-            [
-                QueueNode(
-                    0, ResourceCost({Resource.ORE: 1}), ResourceCost(), ResourceCost()
+        # States for which a better inventory has already been explored
+        explored: dict[tuple[int, int, int, int], list[tuple[int, ...]]] = {}
+
+        # Geodes are accounted for as soon as their robot is built, by counting
+        # everything they will mine until the end
+        def dfs(
+            time: int,
+            robots: tuple[int, int, int],
+            inventory: tuple[int, int, int],
+            geodes: int,
+        ) -> None:
+            nonlocal max_geode
+
+            max_geode = max(max_geode, geodes)
+            ore_robots, clay_robots, obsidian_robots = robots
+            ore, clay, obsidian = inventory
+
+            if geodes + upper_bound(time, obsidian, obsidian_robots) <= max_geode:
+                return
+
+            # Skip states that are dominated by one seen before
+            key = (time, *robots)
+            state = (ore, clay, obsidian, geodes)
+            seen = explored.setdefault(key, [])
+            if any(all(s >= v for s, v in zip(other, state)) for other in seen):
+                return
+            seen.append(state)
+
+            # Jump straight to the next robot being built, most valuable first
+            if obsidian_robots:
+                dt = max(
+                    wait(geode_ore, ore, ore_robots),
+                    wait(geode_obsidian, obsidian, obsidian_robots),
                 )
-            ]
-        )
-        dfs_depth = 0
-        while queue:
-            node = queue.popleft()
-
-            if node.time > dfs_depth:
-                # An awful hack to reduce the search space and prioritize geodes
-                queue = prune_queue(queue)
-                dfs_depth = node.time
-
-            if node.time == run_time:
-                max_geode = max(max_geode, node.total_mined[Resource.GEODE])
-                continue
-
-            # Try building a robot
-            for robot_type in itertools.chain(Resource):
-                costs = self.construction_costs[robot_type]
-                # Don't build robots we can't afford
-                if not node.inventory.has_enough(costs):
-                    continue
-                # Don't build robots when already producing more than enough
-                if robot_type != Resource.GEODE and all(
-                    c[robot_type] <= node.robots[robot_type]
-                    for c in self.construction_costs.values()
-                ):
-                    continue
-                queue.append(do_build(node, robot_type))
-            # Try not building anything
-            queue.append(do_build(node, None))
-
+                if dt < time:
+                    dfs(
+                        time - dt,
+                        robots,
+                        (
+                            ore + ore_robots * dt - geode_ore,
+                            clay + clay_robots * dt,
+                            obsidian + obsidian_robots * dt - geode_obsidian,
+                        ),
+                        geodes + time - dt,
+                    )
+            if clay_robots and obsidian_robots < max_obsidian_robots:
+                dt = max(
+                    wait(obsidian_ore, ore, ore_robots),
+                    wait(obsidian_clay, clay, clay_robots),
+                )
+                if dt < time:
+                    dfs(
+                        time - dt,
+                        (ore_robots, clay_robots, obsidian_robots + 1),
+                        (
+                            ore + ore_robots * dt - obsidian_ore,
+                            clay + clay_robots * dt - obsidian_clay,
+                            obsidian + obsidian_robots * dt,
+                        ),
+                        geodes,
+                    )
+            if clay_robots < max_clay_robots:
+                dt = wait(clay_ore, ore, ore_robots)
+                if dt < time:
+                    dfs(
+                        time - dt,
+                        (ore_robots, clay_robots + 1, obsidian_robots),
+                        (
+                            ore + ore_robots * dt - clay_ore,
+                            clay + clay_robots * dt,
+                            obsidian + obsidian_robots * dt,
+                        ),
+                        geodes,
+                    )
+            if ore_robots < max_ore_robots:
+                dt = wait(ore_ore, ore, ore_robots)
+                if dt < time:
+                    dfs(
+                        time - dt,
+                        (ore_robots + 1, clay_robots, obsidian_robots),
+                        (
+                            ore + ore_robots * dt - ore_ore,
+                            clay + clay_robots * dt,
+                            obsidian + obsidian_robots * dt,
+                        ),
+                        geodes,
+                    )
+
+        # Starting conditions
+        dfs(run_time, (1, 0, 0), (0, 0, 0), 0)
         return max_geode
 
 
@@ -171,10 +181,16 @@ def solve(input: list[str]) -> int:
 
     TIME = 24
 
-    return sum(
-        i * blueprint.maximize_geodes(TIME)
-        for i, blueprint in enumerate(blueprints, start=1)
-    )
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        return sum(
+            i * geodes
+            for i, geodes in enumerate(
+                executor.map(
+                    Blueprint.maximize_geodes, blueprints, itertools.repeat(TIME)
+                ),
+                start=1,
+            )
+        )
 
 
 def main() -> None:
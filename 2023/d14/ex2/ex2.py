@@ -1,9 +1,10 @@
 #!/usr/bin/env python
 
-import itertools
 import sys
 from enum import StrEnum
-from typing import NamedTuple, Optional
+from typing import NamedTuple
+
+import numpy as np
 
 
 class Cell(StrEnum):
@@ -12,134 +13,104 @@ class Cell(StrEnum):
     EMPTY = "."
 
 
-class Map(NamedTuple):
-    rocks: tuple[tuple[Optional[Cell], ...], ...]
-    lines: int
-    rows: int
-
-    def tilt_north(self) -> "Map":
-        rocks = [[Cell.EMPTY for _ in range(self.rows)] for _ in range(self.lines)]
-
-        for y in range(self.rows):
-            rolling_stop = -1
-
-            for x in range(self.lines):
-                # Nothing to do on empty cell
-                if self.rocks[x][y] == Cell.EMPTY:
+# Rollers end up packed against the start of their segment (in the tilting
+# direction), each segment being delimited by cubes or the platform's edges
+class Tilt(NamedTuple):
+    # The segment of each cell, cubes are all in an extra segment without rollers
+    segment: np.ndarray
+    # How far is each cell from the start of its segment
+    rank: np.ndarray
+    num_segments: int
+
+    @classmethod
+    def from_lanes(cls, cubes: np.ndarray, lanes: np.ndarray) -> "Tilt":
+        segment = np.zeros(cubes.size, dtype=np.intp)
+        rank = np.zeros(cubes.size, dtype=np.intp)
+        num_segments = 0
+
+        for lane in lanes.tolist():
+            # Start a new segment at the beginning of each lane, and after cubes
+            num_segments += 1
+            i = 0
+            for cell in lane:
+                if cubes[cell]:
+                    num_segments += 1
+                    i = 0
                     continue
-                # Record the new stop point on cubes
-                if self.rocks[x][y] == Cell.CUBE:
-                    rolling_stop = x
-                    rocks[x][y] = Cell.CUBE
-                    continue
-                # For rollers, roll it up to the `last_cube`
-                rocks[rolling_stop + 1][y] = Cell.ROLLER
-                rolling_stop += 1
-
-        return Map(tuple(map(tuple, rocks)), self.lines, self.rows)
-
-    def tilt_south(self) -> "Map":
-        rocks = [[Cell.EMPTY for _ in range(self.rows)] for _ in range(self.lines)]
-
-        for y in range(self.rows):
-            rolling_stop = self.rows
-
-            for x in reversed(range(self.lines)):
-                # Nothing to do on empty cell
-                if self.rocks[x][y] == Cell.EMPTY:
-                    continue
-                # Record the new stop point on cubes
-                if self.rocks[x][y] == Cell.CUBE:
-                    rolling_stop = x
-                    rocks[x][y] = Cell.CUBE
-                    continue
-                # For rollers, roll it up to the `last_cube`
-                rocks[rolling_stop - 1][y] = Cell.ROLLER
-                rolling_stop -= 1
-
-        return Map(tuple(map(tuple, rocks)), self.lines, self.rows)
-
-    def tilt_west(self) -> "Map":
-        rocks = [[Cell.EMPTY for _ in range(self.rows)] for _ in range(self.lines)]
-
-        for x in range(self.lines):
-            rolling_stop = -1
-
-            for y in range(self.rows):
-                # Nothing to do on empty cell
-                if self.rocks[x][y] == Cell.EMPTY:
-                    continue
-                # Record the new stop point on cubes
-                if self.rocks[x][y] == Cell.CUBE:
-                    rolling_stop = y
-                    rocks[x][y] = Cell.CUBE
-                    continue
-                # For rollers, roll it up to the `last_cube`
-                rocks[x][rolling_stop + 1] = Cell.ROLLER
-                rolling_stop += 1
-
-        return Map(tuple(map(tuple, rocks)), self.lines, self.rows)
-
-    def tilt_east(self) -> "Map":
-        rocks = [[Cell.EMPTY for _ in range(self.rows)] for _ in range(self.lines)]
-
-        for x in range(self.lines):
-            rolling_stop = self.lines
-
-            for y in reversed(range(self.rows)):
-                # Nothing to do on empty cell
-                if self.rocks[x][y] == Cell.EMPTY:
-                    continue
-                # Record the new stop point on cubes
-                if self.rocks[x][y] == Cell.CUBE:
-                    rolling_stop = y
-                    rocks[x][y] = Cell.CUBE
-                    continue
-                # For rollers, roll it up to the `last_cube`
-                rocks[x][rolling_stop - 1] = Cell.ROLLER
-                rolling_stop -= 1
-
-        return Map(tuple(map(tuple, rocks)), self.lines, self.rows)
-
-    def cycle(self) -> "Map":
-        return self.tilt_north().tilt_west().tilt_south().tilt_east()
-
-    def load(self) -> int:
-        res = 0
-
-        for x, y in itertools.product(range(self.lines), range(self.rows)):
-            if self.rocks[x][y] != Cell.ROLLER:
-                continue
-            res += self.lines - x
-
-        return res
+                segment[cell] = num_segments
+                rank[cell] = i
+                i += 1
+        segment[cubes] = 0
+
+        return cls(segment, rank, num_segments + 1)
+
+    def apply(self, rollers: np.ndarray) -> np.ndarray:
+        counts = np.bincount(self.segment[rollers], minlength=self.num_segments)
+        counts[0] = 0
+        return self.rank < counts[self.segment]
+
+
+class Platform(NamedTuple):
+    tilts: tuple[Tilt, Tilt, Tilt, Tilt]
+    # The load of a roller in each cell
+    weights: np.ndarray
+
+    @classmethod
+    def from_cubes(cls, cubes: np.ndarray) -> "Platform":
+        lines, rows = cubes.shape
+        cells = np.arange(cubes.size).reshape(cubes.shape)
+        flat_cubes = cubes.ravel()
+        tilts = (
+            Tilt.from_lanes(flat_cubes, cells.T),  # North
+            Tilt.from_lanes(flat_cubes, cells),  # West
+            Tilt.from_lanes(flat_cubes, cells.T[:, ::-1]),  # South
+            Tilt.from_lanes(flat_cubes, cells[:, ::-1]),  # East
+        )
+        weights = np.repeat(np.arange(lines, 0, -1), rows)
+        return cls(tilts, weights)
+
+    def cycle(self, rollers: np.ndarray) -> np.ndarray:
+        for tilt in self.tilts:
+            rollers = tilt.apply(rollers)
+        return rollers
+
+    def load(self, rollers: np.ndarray) -> int:
+        return int(self.weights[rollers].sum())
 
 
 def solve(input: list[str]) -> int:
-    def parse(input: list[str]) -> Map:
-        rocks = tuple(tuple(Cell(c) for c in line) for line in input)
-        return Map(rocks, len(input), len(input[0]))
-
-    def do_cycles(map: Map) -> Map:
-        cache = {map: 0}
-        t = 0
+    def parse(input: list[str]) -> tuple[Platform, np.ndarray]:
+        grid = np.array([list(line) for line in input])
+        platform = Platform.from_cubes(grid == Cell.CUBE)
+        return platform, (grid == Cell.ROLLER).ravel()
+
+    def do_cycles(platform: Platform, rollers: np.ndarray) -> int:
+        # Zobrist hashing, updated with only the cells that changed on each cycle
+        rng = np.random.default_rng(seed=0)
+        keys = rng.integers(1 << 63, size=rollers.size, dtype=np.uint64)
+        hash = int(np.bitwise_xor.reduce(keys[rollers]))
+
+        cache = {hash: 0}
+        history = [rollers]
         SPIN_CYCLE_LENGTH = 1000000000
-        while t < SPIN_CYCLE_LENGTH:
-            map = map.cycle()
-            t += 1
-            if map in cache:
-                previous_t = cache[map]
+        for t in range(1, SPIN_CYCLE_LENGTH + 1):
+            new_rollers = platform.cycle(rollers)
+            hash ^= int(np.bitwise_xor.reduce(keys[new_rollers ^ rollers]))
+            rollers = new_rollers
+            # Guard against (unlikely) hash collisions
+            previous_t = cache.get(hash)
+            if previous_t is not None and (history[previous_t] == rollers).all():
                 cycle_length = t - previous_t
-                num_cycles = (SPIN_CYCLE_LENGTH - t) // cycle_length
-                t += num_cycles * cycle_length
-            else:
-                cache[map] = t
+                remaining = (SPIN_CYCLE_LENGTH - t) % cycle_length
+                rollers = history[previous_t + remaining]
+                break
+            cache[hash] = t
+            history.append(rollers)
 
-        return map
+        return platform.load(rollers)
 
-    map = parse(input)
-    map = do_cycles(map)
-    return map.load()
+    platform, rollers = parse(input)
+    return do_cycles(platform, rollers)
 
 
 def main() -> None:
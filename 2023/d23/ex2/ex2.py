@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 
+import concurrent.futures
 import copy
+import itertools
+import os
 import sys
 from collections.abc import Iterator
-from typing import NamedTuple, Optional
+from typing import NamedTuple
 
 
 class Point(NamedTuple):
@@ -22,6 +25,58 @@ class Point(NamedTuple):
 
 Trails = set[Point]
 Graph = dict[Point, dict[Point, int]]
+# For each node index, a list of its neighbours' index and their distance
+Adjacency = list[list[tuple[int, int]]]
+
+
+# The longest path from `node` to `end`, avoiding nodes already in `seen`
+def longest_path(
+    adjacency: Adjacency, end: int, node: int, seen: int, length: int
+) -> int:
+    # Each unvisited node can add at most its longest edge to the path
+    max_edge = [max(d for _, d in edges) for edges in adjacency]
+    # Neighbours (as a bitmask) and longest edge of each node, keyed by its bit
+    nodes = {
+        1 << i: (sum(1 << n for n, _ in edges), max_edge[i])
+        for i, edges in enumerate(adjacency)
+    }
+    best = -1
+
+    # Only count the nodes which can still be reached, without going back
+    def upper_bound(node: int, seen: int) -> int:
+        reached = frontier = 1 << node
+        bound = 0
+        while frontier:
+            low = frontier & -frontier
+            frontier ^= low
+            neighbours, edge = nodes[low]
+            bound += edge
+            new = neighbours & ~seen & ~reached
+            reached |= new
+            frontier |= new
+        if not reached & (1 << end):
+            return -1
+        return bound
+
+    def recurse(node: int, seen: int, length: int, remaining: int) -> None:
+        nonlocal best
+        if node == end:
+            best = max(best, length)
+            return
+        # Try the cheap bound first
+        if length + remaining <= best:
+            return
+        bound = upper_bound(node, seen)
+        if bound < 0 or length + bound <= best:
+            return
+        for n, d in adjacency[node]:
+            if seen & (1 << n):
+                continue
+            recurse(n, seen | (1 << n), length + d, remaining - max_edge[n])
+
+    remaining = sum(d for n, d in enumerate(max_edge) if not seen & (1 << n))
+    recurse(node, seen, length, remaining)
+    return best
 
 
 def solve(input: list[str]) -> int:
@@ -65,26 +120,45 @@ def solve(input: list[str]) -> int:
         return graph
 
     def explore(graph: Graph, start: Point, end: Point) -> int:
-        def recurse(start: Point, seen: set[Point]) -> Optional[int]:
-            if start == end:
-                return 0
-            if start not in graph:
-                return None
-            next_step = (
-                (dist, recurse(n, seen | {n}))
-                for n, dist in graph[start].items()
-                if n not in seen
-            )
-            distances = [
-                (dist + steps) for dist, steps in next_step if steps is not None
+        # Renumber junctions to use bitmasks for the set of visited nodes
+        index = {p: i for i, p in enumerate(graph)}
+        # Try longer edges first, to find a good path early for pruning
+        adjacency = [
+            sorted(((index[n], d) for n, d in graph[p].items()), key=lambda e: -e[1])
+            for p in graph
+        ]
+        start_index, end_index = index[start], index[end]
+
+        # Once at the only junction leading to the end, we must go to the end
+        extra = 0
+        if len(adjacency[end_index]) == 1:
+            ((end_index, extra),) = adjacency[end_index]
+
+        # Split the search into independent branches, one per path prefix
+        prefixes = [(start_index, 1 << start_index, 0)]
+        while len(prefixes) < 8 * (os.cpu_count() or 1):
+            new_prefixes = [
+                (n, seen | (1 << n), length + d)
+                for node, seen, length in prefixes
+                for n, d in adjacency[node]
+                if not seen & (1 << n) and node != end_index
             ]
-            if not distances:
-                return None
-            return max(distances)
+            new_prefixes += [p for p in prefixes if p[0] == end_index]
+            if len(new_prefixes) == len(prefixes):
+                break
+            prefixes = new_prefixes
+
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            lengths = executor.map(
+                longest_path,
+                itertools.repeat(adjacency),
+                itertools.repeat(end_index),
+                *zip(*prefixes),
+            )
+            res = max(lengths)
 
-        res = recurse(start, {start})
-        assert res is not None  # Sanity check
-        return res
+        assert res >= 0  # Sanity check
+        return res + extra
 
     trails = parse(input)
     graph = to_graph(trails)
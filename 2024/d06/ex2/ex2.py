@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 
+import concurrent.futures
 import enum
-import itertools
+import os
 import sys
 from typing import NamedTuple
 
@@ -56,6 +57,102 @@ class Guard(NamedTuple):
         return Guard(self.pos, self.dir.turn_right())
 
 
+# For each cell, the coordinate of the next blocker in a given direction, along
+# the row/column of that cell (or just outside of the grid if there is none)
+class Walls(NamedTuple):
+    up: list[list[int]]
+    right: list[list[int]]
+    down: list[list[int]]
+    left: list[list[int]]
+
+
+def compute_walls(blockers: set[Point], dims: Point) -> Walls:
+    max_x, max_y = dims
+    up = [[-1] * max_y for _ in range(max_x)]
+    right = [[max_y] * max_y for _ in range(max_x)]
+    down = [[max_x] * max_y for _ in range(max_x)]
+    left = [[-1] * max_y for _ in range(max_x)]
+
+    for x in range(max_x):
+        wall = -1
+        for y in range(max_y):
+            left[x][y] = wall
+            if (x, y) in blockers:
+                wall = y
+        wall = max_y
+        for y in reversed(range(max_y)):
+            right[x][y] = wall
+            if (x, y) in blockers:
+                wall = y
+
+    for y in range(max_y):
+        wall = -1
+        for x in range(max_x):
+            up[x][y] = wall
+            if (x, y) in blockers:
+                wall = x
+        wall = max_x
+        for x in reversed(range(max_x)):
+            down[x][y] = wall
+            if (x, y) in blockers:
+                wall = x
+
+    return Walls(up, right, down, left)
+
+
+# Does the guard loop when starting from `guard`, with an added `candidate`
+def loops(guard: Guard, candidate: Point, walls: Walls, dims: Point) -> bool:
+    max_x, max_y = dims
+    cx, cy = candidate
+    (x, y), dir = guard
+    # Only need to remember the states right after turning
+    visited: set[tuple[int, int, Direction]] = set()
+    while True:
+        # Jump straight to the next wall, unless the candidate is in the way
+        match dir:
+            case Direction.UP:
+                wall = walls.up[x][y]
+                if cy == y and wall < cx < x:
+                    wall = cx
+                if wall < 0:
+                    return False
+                x = wall + 1
+            case Direction.RIGHT:
+                wall = walls.right[x][y]
+                if cx == x and y < cy < wall:
+                    wall = cy
+                if wall >= max_y:
+                    return False
+                y = wall - 1
+            case Direction.DOWN:
+                wall = walls.down[x][y]
+                if cy == y and x < cx < wall:
+                    wall = cx
+                if wall >= max_x:
+                    return False
+                x = wall - 1
+            case Direction.LEFT:
+                wall = walls.left[x][y]
+                if cx == x and wall < cy < y:
+                    wall = cy
+                if wall < 0:
+                    return False
+                y = wall + 1
+        dir = dir.turn_right()
+        state = (x, y, dir)
+        if state in visited:
+            return True
+        visited.add(state)
+
+
+def count_loops(
+    candidates: list[tuple[Guard, Point]],
+    walls: Walls,
+    dims: Point,
+) -> int:
+    return sum(loops(guard, candidate, walls, dims) for guard, candidate in candidates)
+
+
 def solve(input: str) -> int:
     def parse(input: list[str]) -> tuple[Guard, set[Point]]:
         guard: Guard | None = None
@@ -73,33 +170,38 @@ def solve(input: str) -> int:
         assert guard is not None  # Sanity check
         return guard, blockers
 
-    def loops(guard: Guard, blockers: set[Point], dims: Point) -> int:
+    # Map each cell of the patrol to the guard state just before first reaching it
+    def patrol(guard: Guard, blockers: set[Point], dims: Point) -> dict[Point, Guard]:
         max_x, max_y = dims
-        visited: set[Guard] = set()
+        first_reached: dict[Point, Guard] = {guard.pos: guard}
         while True:
-            if not (0 <= guard.pos.x < max_x):
+            next_guard = guard.patrol_step(blockers)
+            if not (0 <= next_guard.pos.x < max_x):
                 break
-            if not (0 <= guard.pos.y < max_y):
+            if not (0 <= next_guard.pos.y < max_y):
                 break
-            if guard in visited:
-                return True
-            visited.add(guard)
-            guard = guard.patrol_step(blockers)
-        return False
+            first_reached.setdefault(next_guard.pos, guard)
+            guard = next_guard
+        return first_reached
 
     def count_obstructions(guard: Guard, blockers: set[Point], dims: Point) -> int:
-        res = 0
-        max_x, max_y = dims
-        for x, y in itertools.product(range(max_x), range(max_y)):
-            candidate = Point(x, y)
-            if candidate in blockers:
-                continue
-            if candidate == guard.pos:
-                continue
-            if not loops(guard, blockers | {candidate}, dims):
-                continue
-            res += 1
-        return res
+        walls = compute_walls(blockers, dims)
+        # Only cells on the original path can change the patrol
+        candidates = [
+            (start, candidate)
+            for candidate, start in patrol(guard, blockers, dims).items()
+            if candidate != guard.pos
+        ]
+        chunk_count = 4 * (os.cpu_count() or 1)
+        chunk_size = len(candidates) // chunk_count + 1
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            futures = [
+                executor.submit(
+                    count_loops, candidates[i : i + chunk_size], walls, dims
+                )
+                for i in range(0, len(candidates), chunk_size)
+            ]
+            return sum(future.result() for future in futures)
 
     lines = input.splitlines()
     guard, blockers = parse(lines)
@@ -2,28 +2,32 @@
 
 import sys
 
+import numpy as np
+
 
 def solve(input: str) -> int:
-    def monkey_hash(seed: int) -> int:
+    # Computed for all buyers at once
+    def monkey_hash(seeds: np.ndarray) -> np.ndarray:
         MASK = (1 << 24) - 1
-        seed ^= seed << 6
-        seed &= MASK
+        seeds ^= seeds << 6
+        seeds &= MASK
 
-        seed ^= seed >> 5
-        seed &= MASK
+        seeds ^= seeds >> 5
+        seeds &= MASK
 
-        seed ^= seed << 11
-        seed &= MASK
+        seeds ^= seeds << 11
+        seeds &= MASK
 
-        return seed
+        return seeds
 
-    def run_rounds(seed: int) -> int:
+    def run_rounds(seeds: np.ndarray) -> np.ndarray:
+        seeds = seeds.copy()
         for _ in range(2000):
-            seed = monkey_hash(seed)
-        return seed
+            seeds = monkey_hash(seeds)
+        return seeds
 
-    seeds = [int(n) for n in input.splitlines()]
-    return sum(map(run_rounds, seeds))
+    seeds = np.array([int(n) for n in input.splitlines()], dtype=np.uint32)
+    return int(run_rounds(seeds).sum(dtype=np.uint64))
 
 
 def main() -> None:
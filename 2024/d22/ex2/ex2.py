@@ -1,55 +1,62 @@
 #!/usr/bin/env python
 
-import functools
-import itertools
-import operator
 import sys
-from collections import Counter, deque
-from collections.abc import Iterator
 
-Sequence = tuple[int, int, int, int]
+import numpy as np
+
+# Price changes go from -9 to 9, a sequence of 4 is packed as a base-19 index
+CHANGES = 19
+SEQUENCES = CHANGES**4
 
 
 def solve(input: str) -> int:
-    def monkey_hash(seed: int) -> int:
+    # Computed for all buyers at once
+    def monkey_hash(seeds: np.ndarray) -> np.ndarray:
         MASK = (1 << 24) - 1
-        seed ^= seed << 6
-        seed &= MASK
+        seeds ^= seeds << 6
+        seeds &= MASK
 
-        seed ^= seed >> 5
-        seed &= MASK
+        seeds ^= seeds >> 5
+        seeds &= MASK
 
-        seed ^= seed << 11
-        seed &= MASK
+        seeds ^= seeds << 11
+        seeds &= MASK
 
-        return seed
+        return seeds
 
-    def list_prices(seed: int) -> list[int]:
-        prices: list[int] = [seed % 10]
-        for _ in range(2000):
-            seed = monkey_hash(seed)
-            prices.append(seed % 10)
+    # One row of prices per buyer
+    def list_prices(seeds: np.ndarray) -> np.ndarray:
+        seeds = seeds.copy()
+        prices = np.empty((len(seeds), 2001), dtype=np.int8)
+        prices[:, 0] = seeds % 10
+        for i in range(1, 2001):
+            seeds = monkey_hash(seeds)
+            prices[:, i] = seeds % 10
         return prices
 
-    def find_sequences(prices: list[int]) -> Counter[Sequence]:
-        # Adapted from an `itertools` recipe
-        def sliding_window() -> Iterator[tuple[int, ...]]:
-            iterator = iter(prices)
-            window = deque(itertools.islice(iterator, 5 - 1), maxlen=5)
-            for x in iterator:
-                window.append(x)
-                yield tuple(window)
-
-        assert len(prices) == 2001  # Sanity check
-        sequences: Counter[Sequence] = Counter()
-        for i, (a, b, c, d, e) in enumerate(sliding_window(), start=4):
-            sequences.setdefault((b - a, c - b, d - c, e - d), prices[i])
-        return sequences
-
-    seeds = [int(n) for n in input.splitlines()]
-    prices = [list_prices(seed) for seed in seeds]
-    sequences = functools.reduce(operator.add, map(find_sequences, prices))
-    return max(sequences.values())
+    # Total bananas bought by each sequence, as indexed by its base-19 packing
+    def find_sequences(prices: np.ndarray) -> np.ndarray:
+        assert prices.shape[1] == 2001  # Sanity check
+        changes = np.diff(prices).astype(np.intp) + 9
+        sequences = (
+            changes[:, :-3] * CHANGES**3
+            + changes[:, 1:-2] * CHANGES**2
+            + changes[:, 2:-1] * CHANGES
+            + changes[:, 3:]
+        )
+        # Only the first occurrence of a sequence counts for each buyer
+        buyers = np.arange(len(prices))[:, np.newaxis]
+        _, first = np.unique(buyers * SEQUENCES + sequences, return_index=True)
+        return np.bincount(
+            sequences.ravel()[first],
+            weights=prices[:, 4:].ravel()[first],
+            minlength=SEQUENCES,
+        )
+
+    seeds = np.array([int(n) for n in input.splitlines()], dtype=np.uint32)
+    prices = list_prices(seeds)
+    sequences = find_sequences(prices)
+    return int(sequences.max())
 
 
 def main() -> None:
@@ -58,6 +58,7 @@
           buildInputs = with pkgs; [
             (python3.withPackages (ps: with ps; [
               mypy
+              numpy
               z3
             ]))
             pyright